@@ -3,32 +3,33 @@
 import os
 import re
 import json
+import asyncio
+import functools
+import threading
+import time
 import uuid
 import base64
-import boto3
-import pymysql
-import requests
-import logging
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Text
+from urllib.parse import urlparse
 
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
-from rasa_sdk.events import SlotSet, ActionExecutionRejected
-from sqlalchemy import create_engine, text
-import smtplib, ssl
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.utils import formataddr
-from email.mime.image import MIMEImage
-
-import openai
-from openai import OpenAI
-
-# OpenAI Client
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-openai.api_key = os.getenv("OPENAI_API_KEY")
+from rasa_sdk.events import SlotSet
+from sqlalchemy import text
+
+from .db import get_db_engine
+from .llm import chat_completion
+from .jobs import enqueue, job_handler, start_workers
+from .smtp_pool import SMTPConnectionPool
+from .image_cache import image_cache, key_from_url
+from .images import make_thumbnail, preprocess_data_url, preprocess_image
+from .blob_store import blob_store, is_blob_ref
+from .vision_cache import vision_cache, analysis_key, match_key
+from .sentiment import sentiment_scores
+from .rephrase import rephrase_description
+from .kb import KB_WARMUP, get_kb, kb_ready, kb_status, warm_up_in_background
+from .classify import COMPLAINT_TYPES, CLASSIFIER_LLM_FALLBACK, llm_complaint_type, local_complaint_type
 
 # OneSignal Configuration
 ONESIGNAL_APP_ID = os.getenv("ONESIGNAL_APP_ID")
@@ -40,20 +41,30 @@ SMTP_USERNAME = os.getenv("SMTP_USERNAME")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 SMTP_FROM_NAME = os.getenv("SMTP_FROM_NAME", "Building Bot")
 EMAIL_SENDER = os.getenv("EMAIL_SENDER", SMTP_USERNAME)
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+SMTP_MAX_IDLE_SECONDS = float(os.getenv("SMTP_MAX_IDLE_SECONDS", "60"))
 EMAIL_ENABLED = os.getenv("EMAIL_ENABLED", "true").lower() == "true"
 EMAIL_PROVIDER = os.getenv("EMAIL_PROVIDER", "smtp").lower()  # 'smtp' or 'onesignal'
+# Inline photo in notification emails: 'full' (the uploaded image) or 'thumbnail'
+# (IMAGE_THUMBNAIL_SIZE px, smaller emails at lower image quality)
+EMAIL_INLINE_IMAGE = os.getenv("EMAIL_INLINE_IMAGE", "full").lower()
+
+# One structured LLM call for rephrase + sentiment instead of two parallel ones
+COMBINED_ENRICHMENT = os.getenv("COMBINED_ENRICHMENT", "false").lower() == "true"
+
+# Defer sentiment scoring, notifications and email to the job queue (see jobs.py)
+BACKGROUND_JOBS = os.getenv("BACKGROUND_JOBS", "true").lower() == "true"
 
-# Database Configuration
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = os.getenv("DB_PORT", "3306")
-DB_DATABASE = os.getenv("DB_DATABASE", "bms_ged")
-DB_USERNAME = os.getenv("DB_USERNAME", "root")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "")
 # ==================== HELPER FUNCTIONS ====================
-def get_db_engine():
-    """Create and return database engine with credentials from env"""
-    connection_string = f"mysql+pymysql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_DATABASE}"
-    return create_engine(connection_string)
+# get_db_engine() returns one pooled engine shared by every action (see db.py)
+
+def run_in_thread(run):
+    """Run a blocking Action.run() in a worker thread so it doesn't stall the event loop"""
+    @functools.wraps(run)
+    async def wrapper(self, dispatcher, tracker, domain):
+        return await asyncio.to_thread(run, self, dispatcher, tracker, domain)
+    return wrapper
 
 def parse_data_url(data_url: str):
     m = re.match(r"^data:(image/\w+);base64,(.+)$", data_url)
@@ -62,10 +73,64 @@ def parse_data_url(data_url: str):
     mime, b64 = m.groups()
     return mime, base64.b64decode(b64)
 
+def has_image(value) -> bool:
+    """True for an uploaded_image_url slot value that still needs uploading (blob ref or legacy data URL)"""
+    return is_blob_ref(value) or (isinstance(value, str) and value.startswith("data:image/"))
+
+def stage_image(data_url: str) -> str:
+    """Move a data URL into the blob store and return the short reference kept in the slot"""
+    try:
+        mime, blob = parse_data_url(data_url)
+        return blob_store.put(blob, mime)
+    except Exception as e:
+        print(f"[BLOB] Staging failed, keeping inline image: {e}")
+        return data_url
+
+def load_image(value: str):
+    """(mime, bytes) for a blob reference or data URL"""
+    if is_blob_ref(value):
+        staged = blob_store.get(value)
+        if staged is None:
+            raise ValueError(f"Staged image not found: {value}")
+        return staged
+    return parse_data_url(value)
+
+def image_data_url(value: str) -> str:
+    """Resolve a slot value to a data URL for the vision model"""
+    if not is_blob_ref(value):
+        return value
+    mime, blob = load_image(value)
+    return f"data:{mime};base64,{base64.b64encode(blob).decode('ascii')}"
+
 # ==================== IMPROVED B2 UPLOAD FUNCTION ====================
 
+B2_MAX_POOL_CONNECTIONS = int(os.getenv("B2_MAX_POOL_CONNECTIONS", "10"))
+
+_b2_client = None
+_b2_client_lock = threading.Lock()
+_upload_hooks = []
+upload_stats = {"uploads": 0, "failures": 0, "bytes": 0, "seconds": 0.0}
+
+def _b2_endpoint_url() -> str:
+    # Full URLs (e.g. http://localhost:9000 for MinIO/moto) are used as-is
+    endpoint = os.getenv("B2_ENDPOINT", "")
+    return endpoint if endpoint.startswith(("http://", "https://")) else f"https://{endpoint}"
+
+def b2_public_url(bucket: str, key: str) -> str:
+    """Public URL of an uploaded object, on the same endpoint the client uploads to"""
+    endpoint = urlparse(_b2_endpoint_url())
+    if endpoint.hostname and endpoint.hostname.endswith("backblazeb2.com"):
+        # B2's own S3 endpoints serve buckets virtual-host style
+        return f"https://{bucket}.{endpoint.netloc}/{key}"
+    # Custom endpoints: path style
+    return f"{_b2_endpoint_url().rstrip('/')}/{bucket}/{key}"
+
 def b2_client():
-    """Create B2 client with validation"""
+    """Return the cached B2 client, creating it (with validation) on first use"""
+    global _b2_client
+    if _b2_client is not None:
+        return _b2_client
+
     endpoint = os.getenv("B2_ENDPOINT")
     key_id = os.getenv("B2_KEY_ID")
     app_key = os.getenv("B2_APP_KEY")
@@ -78,28 +143,57 @@ def b2_client():
         if not app_key: missing.append("B2_APP_KEY")
         raise ValueError(f"Missing B2 credentials: {', '.join(missing)}")
     
-    # Create client with timeout config
-    config = boto3.session.Config(
-        connect_timeout=10,
-        read_timeout=30,
-        retries={'max_attempts': 2}
-    )
-    
-    return boto3.client(
-        "s3",
-        endpoint_url=f"https://{endpoint}",
-        aws_access_key_id=key_id,
-        aws_secret_access_key=app_key,
-        region_name="eu-central-003",
-        config=config
-    )
+    with _b2_client_lock:
+        if _b2_client is None:
+            import boto3   # imported on first upload, not at action-server startup
+
+            # Client with timeout config and a reusable keep-alive connection pool
+            config = boto3.session.Config(
+                connect_timeout=10,
+                read_timeout=30,
+                retries={'max_attempts': 2},
+                max_pool_connections=B2_MAX_POOL_CONNECTIONS,
+                tcp_keepalive=True
+            )
+            
+            # boto3 clients are thread-safe; sessions are not, so use a dedicated one
+            session = boto3.session.Session()
+            _b2_client = session.client(
+                "s3",
+                endpoint_url=_b2_endpoint_url(),
+                aws_access_key_id=key_id,
+                aws_secret_access_key=app_key,
+                region_name=os.getenv("B2_REGION", "eu-central-003"),
+                config=config
+            )
+            print(f"[B2] Client created (max_pool_connections={B2_MAX_POOL_CONNECTIONS})")
+    return _b2_client
+
+def add_upload_metrics_hook(hook):
+    """Register hook(key, size_bytes, seconds, ok) called after every B2 upload"""
+    _upload_hooks.append(hook)
+
+def _record_upload(key: str, size_bytes: int, seconds: float, ok: bool):
+    upload_stats["uploads" if ok else "failures"] += 1
+    if ok:
+        upload_stats["bytes"] += size_bytes
+        upload_stats["seconds"] += seconds
+    for hook in _upload_hooks:
+        try:
+            hook(key, size_bytes, seconds, ok)
+        except Exception as e:
+            print(f"[B2] Metrics hook error: {e}")
+
+
+def thumbnail_key(key: str) -> str:
+    return f"{key}#thumb"
 
 
-def upload_to_b2(data_url: str, bucket: str, key_prefix="complaints/"):
-    """Upload image to B2 with better error handling"""
+def upload_to_b2(image: str, bucket: str, key_prefix="complaints/"):
+    """Upload image (blob reference or data URL) to B2 with better error handling"""
     try:
-        # Parse image
-        mime, blob = parse_data_url(data_url)
+        # Load image
+        mime, blob = load_image(image)
         blob_size_mb = len(blob) / (1024 * 1024)
         
         print(f"[B2] Uploading image: {mime}, size: {blob_size_mb:.2f} MB")
@@ -108,6 +202,9 @@ def upload_to_b2(data_url: str, bucket: str, key_prefix="complaints/"):
         if blob_size_mb > 10:
             raise ValueError(f"Image too large: {blob_size_mb:.2f} MB (max 10 MB)")
         
+        # No-op for images already preprocessed on receipt
+        mime, blob = preprocess_image(blob, mime)
+
         ext = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"}.get(mime, "bin")
         key = f"{key_prefix}{datetime.utcnow():%Y/%m}/{uuid.uuid4().hex}.{ext}"
         
@@ -116,21 +213,35 @@ def upload_to_b2(data_url: str, bucket: str, key_prefix="complaints/"):
         
         print(f"[B2] Uploading to bucket: {bucket}, key: {key}")
         
-        s3.put_object(
-            Bucket=bucket,
-            Key=key,
-            Body=blob,
-            ContentType=mime
-        )
+        upload_start = time.perf_counter()
+        try:
+            s3.put_object(
+                Bucket=bucket,
+                Key=key,
+                Body=blob,
+                ContentType=mime
+            )
+        except Exception:
+            _record_upload(key, len(blob), time.perf_counter() - upload_start, ok=False)
+            raise
+        upload_seconds = time.perf_counter() - upload_start
+        _record_upload(key, len(blob), upload_seconds, ok=True)
+        
+        # Keep the bytes so the notification email can embed them without downloading
+        image_cache.put(key, blob, mime)
+        if EMAIL_INLINE_IMAGE == "thumbnail":
+            thumbnail = make_thumbnail(blob)
+            if thumbnail:
+                image_cache.put(thumbnail_key(key), thumbnail[1], thumbnail[0])
         
-        public_url = f"https://{bucket}.s3.eu-central-003.backblazeb2.com/{key}"
+        public_url = b2_public_url(bucket, key)
         presigned = s3.generate_presigned_url(
             "get_object",
             Params={"Bucket": bucket, "Key": key},
             ExpiresIn=int(timedelta(hours=1).total_seconds())
         )
         
-        print(f"[B2] Upload successful: {public_url}")
+        print(f"[B2] Upload successful in {upload_seconds:.2f}s: {public_url}")
         return public_url, presigned, key
         
     except ValueError as ve:
@@ -144,24 +255,83 @@ def upload_to_b2(data_url: str, bucket: str, key_prefix="complaints/"):
         traceback.print_exc()
         raise Exception(f"B2 upload failed: {str(e)}")
     
-def get_sentiment_score(text_val: str):
-    prompt = f"Rate the sentiment of this text from -1 (very negative) to +1 (very positive): {text_val}"
-    try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=5,
-            temperature=0
-        )
-        score = float(response.choices[0].message.content.strip())
-        return max(min(score, 1), -1)
-    except Exception as e:
-        print("Sentiment error:", e)
-        return 0
+async def get_sentiment_score(text_val: str):
+    """Sentiment in [-1, 1] from the configured backend (SENTIMENT_BACKEND), or None if scoring failed"""
+    return (await sentiment_scores([text_val or ""]))[0]
+
+_smtp_pool = None
+_smtp_pool_lock = threading.Lock()
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    """Process-wide keep-alive SMTP connection pool"""
+    global _smtp_pool
+    if _smtp_pool is None:
+        with _smtp_pool_lock:
+            if _smtp_pool is None:
+                _smtp_pool = SMTPConnectionPool(
+                    SMTP_HOST,
+                    SMTP_PORT,
+                    username=SMTP_USERNAME,
+                    password=SMTP_PASSWORD,
+                    starttls=SMTP_STARTTLS,
+                    max_connections=SMTP_POOL_SIZE,
+                    max_idle_seconds=SMTP_MAX_IDLE_SECONDS,
+                )
+    return _smtp_pool
+
+def build_smtp_message(to_email: str, subject: str, html_body: str, text_fallback: str = None, image_url: str = None):
+    """
+    Build the MIME message. Embeds ONE inline image from a public URL.
+    Returns (message, embedded).
+    """
+    from email.mime.image import MIMEImage
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    from email.utils import formataddr
+
+    msg = MIMEMultipart("related")   # related = allows inline images
+    msg["Subject"] = subject
+    msg["From"] = formataddr((SMTP_FROM_NAME, EMAIL_SENDER))
+    msg["To"] = to_email
+
+    # Build alternative (plain + HTML) container
+    alt = MIMEMultipart("alternative")
+    msg.attach(alt)
+
+    # Plain text fallback
+    if not text_fallback:
+        text_fallback = re.sub(r"<[^>]+>", "", html_body or "")
+    alt.attach(MIMEText(text_fallback, "plain", "utf-8"))
+
+    # If we have an image_url AND the HTML references cid:complaint_photo,
+    # embed the image: cached upload bytes first, download only as a fallback
+    embedded = False
+    if image_url and "cid:complaint_photo" in (html_body or ""):
+        try:
+            key = key_from_url(image_url, os.getenv("B2_BUCKET", "rasabot"))
+            content = ((EMAIL_INLINE_IMAGE == "thumbnail" and image_cache.get(thumbnail_key(key)))
+                       or image_cache.get(key))
+            if content is None:
+                import requests
+                r = requests.get(image_url, timeout=15)
+                r.raise_for_status()
+                content = r.content
+            img_part = MIMEImage(content)
+            img_part.add_header("Content-ID", "<complaint_photo>")
+            img_part.add_header("Content-Disposition", "inline", filename="complaint_photo")
+            msg.attach(img_part)
+            embedded = True
+            print("[SMTP] Inline image embedded")
+        except Exception as e:
+            print(f"[SMTP] Inline image fetch failed, will fall back to remote URL: {e}")
+
+    # Attach the HTML (if embedding failed, HTML can still use remote <img src="image_url">)
+    alt.attach(MIMEText(html_body or "", "html", "utf-8"))
+    return msg, embedded
 
 def send_smtp_email(to_email: str, subject: str, html_body: str, text_fallback: str = None, image_url: str = None):
     """
-    Send email via Gmail SMTP (STARTTLS). Supports embedding ONE inline image from a public URL.
+    Send email via SMTP (STARTTLS) over a pooled connection. Supports embedding ONE inline image from a public URL.
     Returns {'ok': True} or {'error': '...'}.
     """
     if not EMAIL_ENABLED:
@@ -173,46 +343,8 @@ def send_smtp_email(to_email: str, subject: str, html_body: str, text_fallback:
         return {"error": "missing_smtp_credentials"}
 
     try:
-        msg = MIMEMultipart("related")   # related = allows inline images
-        msg["Subject"] = subject
-        msg["From"] = formataddr((SMTP_FROM_NAME, EMAIL_SENDER))
-        msg["To"] = to_email
-
-        # Build alternative (plain + HTML) container
-        alt = MIMEMultipart("alternative")
-        msg.attach(alt)
-
-        # Plain text fallback
-        if not text_fallback:
-            text_fallback = re.sub(r"<[^>]+>", "", html_body or "")
-        alt.attach(MIMEText(text_fallback, "plain", "utf-8"))
-
-        # If we have an image_url AND the HTML references cid:complaint_photo,
-        # try to fetch and embed the image
-        embedded = False
-        if image_url and "cid:complaint_photo" in (html_body or ""):
-            try:
-                r = requests.get(image_url, timeout=15)
-                r.raise_for_status()
-                img_part = MIMEImage(r.content)
-                img_part.add_header("Content-ID", "<complaint_photo>")
-                img_part.add_header("Content-Disposition", "inline", filename="complaint_photo")
-                msg.attach(img_part)
-                embedded = True
-                print("[SMTP] Inline image embedded from URL")
-            except Exception as e:
-                print(f"[SMTP] Inline image fetch failed, will fall back to remote URL: {e}")
-
-        # Attach the HTML (if embedding failed, HTML can still use remote <img src="image_url">)
-        alt.attach(MIMEText(html_body or "", "html", "utf-8"))
-
-        context = ssl.create_default_context()
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=20) as server:
-            server.ehlo()
-            server.starttls(context=context)
-            server.ehlo()
-            server.login(SMTP_USERNAME, SMTP_PASSWORD)
-            server.sendmail(EMAIL_SENDER, [to_email], msg.as_string())
+        msg, embedded = build_smtp_message(to_email, subject, html_body, text_fallback, image_url)
+        get_smtp_pool().send(EMAIL_SENDER, [to_email], msg.as_string())
 
         print(f"[SMTP] Email sent to {to_email} (inline={'yes' if embedded else 'no'})")
         return {"ok": True}
@@ -220,7 +352,6 @@ def send_smtp_email(to_email: str, subject: str, html_body: str, text_fallback:
         print(f"[ERR] SMTP email error: {e}")
         return {"error": str(e)}
 
-    
 def send_onesignal_email(to_email: str, subject: str, html_body: str, include_unsubscribed: bool = False):
     """Send email via OneSignal Email channel"""
     if not (ONESIGNAL_APP_ID and ONE_SIGNAL_API_KEY):
@@ -240,6 +371,8 @@ def send_onesignal_email(to_email: str, subject: str, html_body: str, include_un
         "Content-Type": "application/json",
     }
 
+    import requests
+
     try:
         resp = requests.post(url, headers=headers, json=payload, timeout=20)
         try:
@@ -252,13 +385,262 @@ def send_onesignal_email(to_email: str, subject: str, html_body: str, include_un
         print("[ERR] OneSignal email error:", e)
         return {"error": str(e)}
 
+# Employee, tenant, active contract, unit and owner in one round trip
+NOTIFICATION_CONTEXT_QUERY = text("""
+    SELECT
+        e.user_id   AS employee_id,
+        e.user_name AS employee_name,
+        e.email     AS employee_email,
+        t.user_id   AS tenant_id,
+        t.user_name AS tenant_name,
+        t.user_type AS tenant_type,
+        c.contrat_id,
+        u.unit_id,
+        u.unit_name,
+        o.user_id   AS owner_id,
+        o.user_name AS owner_name
+    FROM (SELECT 1) AS anchor
+    LEFT JOIN users e ON e.user_id = :emp_id
+    LEFT JOIN users t ON t.user_id = :user_id
+    LEFT JOIN contrats c ON c.contrat_id = (
+        SELECT contrat_id
+        FROM contrats
+        WHERE tenant_id = :user_id AND contrat_status = 1
+        LIMIT 1
+    )
+    LEFT JOIN unites u ON u.unit_id = c.unit_id
+    LEFT JOIN users o ON o.user_id = u.user_id
+""")
+
+INSERT_NOTIFICATION_QUERY = text("""
+    INSERT INTO notifications (id, type, notifiable_type, notifiable_id, data, read_at, created_at, updated_at)
+    VALUES (:id, :type, :notifiable_type, :notifiable_id, :data, :read_at, :created_at, :updated_at)
+""")
+
+def create_complaint_notifications(conn, complaint_id, complaint_title, user_id, assigned_employee_id, **_):
+    """
+    Insert in-app notifications for the assigned employee and the unit owner.
+    Runs on the caller's connection so it shares the complaint INSERT's
+    transaction; the caller commits. Returns the context row (employee email included).
+    """
+    ctx = conn.execute(NOTIFICATION_CONTEXT_QUERY, {"emp_id": assigned_employee_id, "user_id": user_id}).fetchone()
+
+    has_tenant = ctx.tenant_id is not None
+    has_contract = ctx.contrat_id is not None
+    has_unit = ctx.unit_id is not None
+    now = datetime.now()
+
+    def notification(notification_type, notifiable_id, title, body):
+        return {
+            "id": str(uuid.uuid4()),
+            "type": notification_type,
+            "notifiable_type": "App\\Models\\User",
+            "notifiable_id": notifiable_id,
+            "data": json.dumps({"title": title, "body": body, "type": "Complaint"}),
+            "read_at": None,
+            "created_at": now,
+            "updated_at": now
+        }
+
+    notifications_to_insert = []
+
+    # Notification to assigned employee
+    if ctx.employee_id is not None:
+        if has_contract and has_tenant and ctx.tenant_type == 'T':
+            notifications_to_insert.append(notification(
+                "App\\Notifications\\ComplaintAssigned",
+                ctx.employee_id,
+                "New Complaint Assigned",
+                f"A new complaint \"{complaint_title}\" has been assigned to you from {ctx.tenant_name} in unit {ctx.unit_name if has_unit else 'N/A'}."
+            ))
+        else:
+            notifications_to_insert.append(notification(
+                "App\\Notifications\\GeneralComplaintAssigned",
+                ctx.employee_id,
+                "New Complaint Assigned",
+                f"A new complaint \"{complaint_title}\" has been assigned to you."
+            ))
+        print(f"✓ Notification created for employee: {ctx.employee_name}")
+
+    # Notification to owner (if tenant complaint)
+    if ctx.owner_id is not None and has_tenant and has_contract and has_unit:
+        notifications_to_insert.append(notification(
+            "App\\Notifications\\ComplaintFromTenant",
+            ctx.owner_id,
+            "New Complaint From Tenant",
+            f"Your tenant {ctx.tenant_name} in unit {ctx.unit_name} has submitted a complaint: \"{complaint_title}\"."
+        ))
+        print(f"✓ Notification created for owner: {ctx.owner_name}")
+
+    # Insert all notifications in one executemany round trip
+    if notifications_to_insert:
+        conn.execute(INSERT_NOTIFICATION_QUERY, notifications_to_insert)
+        print(f"✓ Inserted {len(notifications_to_insert)} notifications into database")
+
+    return ctx
+
+def send_complaint_email(complaint_id, complaint_title, complaint_description, rephrased, complaint_type,
+                         complaint_pictures, building_id, assigned_employee_email, **_):
+    """Email the assigned employee about a new complaint; raises on delivery failure"""
+    if not assigned_employee_email:
+        print("✗ No assigned employee email, skipping notification email")
+        return
+
+    first_pic_url = None
+    if complaint_pictures and complaint_pictures.startswith("["):
+        try:
+            pics = json.loads(complaint_pictures)
+            if pics:
+                first_pic_url = pics[0]
+        except Exception:
+            pass
+
+    badge_colors = {
+        "Electricity failure": "#F59E0B",
+        "Plumbing failure": "#3B82F6",
+        "Technical failure": "#10B981",
+        "Caretaker failure": "#EF4444",
+    }
+    badge_color = badge_colors.get(complaint_type, "#6B7280")
+
+    subject = f"New Complaint #{complaint_id} • {complaint_type or 'Complaint'}"
+
+    img_section = ""
+    if first_pic_url:
+        img_section = f"""
+        <tr>
+        <td style="padding-top:16px;">
+            <div style="font-size:14px;color:#374151;margin-bottom:8px;">Photo</div>
+            <img src="cid:complaint_photo" alt="Complaint photo" style="max-width:100%;border-radius:12px;border:1px solid #e5e7eb;">
+            <div style="margin-top:8px;font-size:13px;">
+            <a href="{first_pic_url}" target="_blank" style="color:#2563EB;text-decoration:none;">Open image in browser</a>
+            </div>
+        </td>
+        </tr>
+        """
+
+    body = f"""
+    <div style="background:#f8fafc;padding:24px;">
+    <table role="presentation" cellpadding="0" cellspacing="0" width="100%" style="max-width:680px;margin:0 auto;background:#ffffff;border-radius:16px;border:1px solid #e5e7eb;box-shadow:0 1px 2px rgba(0,0,0,.04);">
+        <tr>
+        <td style="padding:24px 24px 8px 24px;">
+            <div style="font-size:18px;font-weight:700;color:#111827;">New Complaint Assigned</div>
+            <div style="margin-top:6px;font-size:13px;color:#6B7280;">Complaint #{complaint_id} • Building {building_id}</div>
+            <span style="display:inline-block;margin-top:12px;padding:6px 10px;border-radius:999px;background:{badge_color};color:white;font-size:12px;font-weight:600;">
+            {complaint_type or 'Complaint'}
+            </span>
+        </td>
+        </tr>
+        <tr>
+        <td style="padding:8px 24px 24px 24px;">
+            <table role="presentation" cellpadding="0" cellspacing="0" width="100%" style="border-collapse:separate;border-spacing:0 8px;">
+            <tr>
+                <td style="width:140px;font-size:13px;color:#6B7280;">Title</td>
+                <td style="font-size:14px;color:#111827;font-weight:600;">{(complaint_title or '').strip()}</td>
+            </tr>
+            <tr>
+                <td style="width:140px;font-size:13px;color:#6B7280;">Type</td>
+                <td style="font-size:14px;color:#111827;">{complaint_type or '-'}</td>
+            </tr>
+            <tr>
+                <td style="width:140px;font-size:13px;color:#6B7280;vertical-align:top;">Description</td>
+                <td style="font-size:14px;color:#111827;line-height:1.5;">{(complaint_description or '').strip()}</td>
+            </tr>
+            </table>
+            {img_section}
+            <div style="margin-top:20px;">
+            <a href="#" style="display:inline-block;background:#111827;color:#ffffff;text-decoration:none;padding:10px 14px;border-radius:10px;font-size:13px;font-weight:600;">Open in Dashboard</a>
+            </div>
+        </td>
+        </tr>
+    </table>
+    <div style="max-width:680px;margin:10px auto 0;text-align:center;color:#9CA3AF;font-size:12px;">
+        Sent by Building Bot
+    </div>
+    </div>
+    """
+
+    text_fallback = f"""New Complaint Assigned
+    Complaint #{complaint_id} - Building {building_id}
+    Type: {complaint_type or '-'}
+    Title: {(complaint_title or '').strip()}
+    Description: {(rephrased or '').strip()}
+    {('Photo: ' + first_pic_url) if first_pic_url else ''}"""
+
+    email_to_send = assigned_employee_email
+
+    if EMAIL_PROVIDER == "smtp":
+        resp = send_smtp_email(email_to_send, subject, body, text_fallback=text_fallback, image_url=first_pic_url)
+    else:
+        resp = send_onesignal_email(email_to_send, subject, body, include_unsubscribed=False)
+
+    if not resp or not resp.get("ok", False):
+        if EMAIL_PROVIDER != "smtp" and isinstance(resp, dict) and "id" in resp:
+            pass
+        elif isinstance(resp, dict) and resp.get("error") == "email_disabled":
+            return
+        else:
+            raise RuntimeError(f"Email send failed via {EMAIL_PROVIDER}: {resp}")
+
+    print(f"✓ Email sent to {email_to_send} via {EMAIL_PROVIDER.upper()}")
+
+# ==================== BACKGROUND JOBS ====================
+
+@job_handler("complaint_sentiment")
+async def score_complaint_sentiment_job(payload):
+    sentiment_score = await get_sentiment_score(payload["description"])
+    if sentiment_score is None:
+        raise RuntimeError("Sentiment scoring failed")
+    with get_db_engine().connect() as conn:
+        conn.execute(
+            text("UPDATE complains SET sentiment_score = :score WHERE compl_id = :complaint_id"),
+            {"score": sentiment_score, "complaint_id": payload["complaint_id"]}
+        )
+        conn.commit()
+    print(f"✓ Sentiment {sentiment_score} stored for complaint {payload['complaint_id']}")
+
+def enqueue_sentiment(complaint_id, description):
+    """Queue sentiment scoring for a saved complaint; on queue errors the score just stays NULL"""
+    try:
+        enqueue("complaint_sentiment", {"complaint_id": complaint_id, "description": description})
+    except Exception as e:
+        print(f"✗ Could not queue sentiment for complaint {complaint_id}, leaving it NULL: {e}")
+
+@job_handler("complaint_email")
+def complaint_email_job(payload):
+    send_complaint_email(**payload)
+
+if BACKGROUND_JOBS:
+    # Pick up jobs left over from a previous run
+    start_workers()
+
+if KB_WARMUP:
+    # Started here, not in actions/__init__.py, so scripts that only import
+    # actions.db / actions.sentiment don't load the KB
+    warm_up_in_background()
+
 class ActionSubmitComplaintResolved(Action):
     """Submit complaint as RESOLVED (status=2) - no employee assignment needed"""
     
     def name(self):
         return "action_submit_complaint_resolved"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: dict):
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: dict):
+
+        if not tracker.get_slot("complaint_title") or not tracker.get_slot("complaint_description"):
+            dispatcher.utter_message("Please provide complete complaint details.")
+            return []
+
+        if BACKGROUND_JOBS:
+            # Sentiment is scored by a background job after the INSERT
+            rephrased, sentiment_score = await get_rephrased_description(tracker), None
+        else:
+            rephrased, sentiment_score = await get_complaint_enrichment(tracker)
+
+        # Image upload and the INSERT are blocking; keep them off the event loop
+        return await asyncio.to_thread(self._submit, dispatcher, tracker, rephrased, sentiment_score)
+
+    def _submit(self, dispatcher: CollectingDispatcher, tracker: Tracker, rephrased: str, sentiment_score: float):
 
         # Get slots
         complaint_title = tracker.get_slot("complaint_title")
@@ -282,18 +664,12 @@ class ActionSubmitComplaintResolved(Action):
         print(f"Assigned to: NULL (self-resolved)")
         print("="*60 + "\n")
 
-        if not complaint_title or not complaint_description:
-            dispatcher.utter_message("Please provide complete complaint details.")
-            return []
-
         if not complaint_pictures:
             complaint_pictures = "[]"
 
-        sentiment_score = get_sentiment_score(complaint_description)
-        rephrased = get_rephrased_description(tracker)
         try:
             # Handle image upload
-            if complaint_pictures and isinstance(complaint_pictures, str) and complaint_pictures.startswith("data:image/"):
+            if has_image(complaint_pictures):
                 try:
                     bucket = os.getenv("B2_BUCKET", "rasabot")
                     public_url, presigned_url, key = upload_to_b2(complaint_pictures, bucket)
@@ -337,6 +713,10 @@ class ActionSubmitComplaintResolved(Action):
 
             print(f"✓ Complaint {complaint_id} inserted as RESOLVED (status=2)")
 
+            if BACKGROUND_JOBS and sentiment_score is None:
+                # Same as the Pending path: no queue (or workers) when jobs are disabled
+                enqueue_sentiment(complaint_id, complaint_description)
+
             # Success message
             dispatcher.utter_message(
                 f"✅ Complaint #{complaint_id} submitted and marked as resolved!\n"
@@ -362,7 +742,22 @@ class ActionSubmitComplaintPending(Action):
     def name(self):
         return "action_submit_complaint_pending"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: dict):
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: dict):
+
+        if not tracker.get_slot("complaint_title") or not tracker.get_slot("complaint_description"):
+            dispatcher.utter_message("Please provide complete complaint details.")
+            return []
+
+        if BACKGROUND_JOBS:
+            # Sentiment is scored by a background job after the INSERT
+            rephrased, sentiment_score = await get_rephrased_description(tracker), None
+        else:
+            rephrased, sentiment_score = await get_complaint_enrichment(tracker)
+
+        # Image upload, DB writes and SMTP are blocking; keep them off the event loop
+        return await asyncio.to_thread(self._submit, dispatcher, tracker, rephrased, sentiment_score)
+
+    def _submit(self, dispatcher: CollectingDispatcher, tracker: Tracker, rephrased: str, sentiment_score: float):
 
         # Get slots
         complaint_title = tracker.get_slot( "complaint_title")
@@ -391,18 +786,12 @@ class ActionSubmitComplaintPending(Action):
         print(f"Assigned to: {selected_employee_name} (ID: {assigned_employee_id})")
         print("="*60 + "\n")
         print(f"image{complaint_pictures}")
-        if not complaint_title or not complaint_description:
-            dispatcher.utter_message("Please provide complete complaint details.")
-            return []
-
         if not complaint_pictures:
             complaint_pictures = "[]"
-        rephrased = get_rephrased_description(tracker)
-        sentiment_score = get_sentiment_score(complaint_description)
         
         try:
             # Handle image upload
-            if complaint_pictures and isinstance(complaint_pictures, str) and complaint_pictures.startswith("data:image/"):
+            if has_image(complaint_pictures):
                 try:
                     bucket = os.getenv("B2_BUCKET", "rasabot")
                     public_url, presigned_url, key = upload_to_b2(complaint_pictures, bucket)
@@ -449,242 +838,54 @@ class ActionSubmitComplaintPending(Action):
                         "assigned_to": assigned_employee_id,
                     }
                 )
-                conn.commit()
                 complaint_id = result.lastrowid
 
+                # CREATE NOTIFICATIONS in the same transaction as the complaint
+                ctx = create_complaint_notifications(
+                    conn,
+                    complaint_id=complaint_id,
+                    complaint_title=complaint_title,
+                    user_id=user_id,
+                    assigned_employee_id=assigned_employee_id,
+                )
+                conn.commit()
+
             print(f"✓ Complaint {complaint_id} inserted as PENDING (status=0)")
 
-            # CREATE NOTIFICATIONS (same as before)
-            with engine.connect() as conn:
-                
-                # Get assigned employee info
-                employee_query = text("""
-                    SELECT user_id, user_name, email, user_type
-                    FROM users
-                    WHERE user_id = :emp_id
-                """)
-                employee = conn.execute(employee_query, {"emp_id": assigned_employee_id}).fetchone()
-                
-                # Get tenant/complainer info
-                tenant_query = text("""
-                    SELECT user_id, user_name, email, user_type
-                    FROM users
-                    WHERE user_id = :user_id
-                """)
-                tenant = conn.execute(tenant_query, {"user_id": user_id}).fetchone()
-                
-                # Check for active contract
-                contract_query = text("""
-                    SELECT contrat_id, unit_id, tenant_id
-                    FROM contrats
-                    WHERE tenant_id = :tenant_id AND contrat_status = 1
-                    LIMIT 1
-                """)
-                contract = conn.execute(contract_query, {"tenant_id": user_id}).fetchone()
-                
-                unit = None
-                owner = None
-                
-                if contract:
-                    # Get unit info
-                    unit_query = text("""
-                        SELECT unit_id, unit_name, user_id
-                        FROM unites
-                        WHERE unit_id = :unit_id
-                    """)
-                    unit = conn.execute(unit_query, {"unit_id": contract.unit_id}).fetchone()
-                    
-                    if unit:
-                        # Get owner info
-                        owner_query = text("""
-                            SELECT user_id, user_name, email
-                            FROM users
-                            WHERE user_id = :owner_id
-                        """)
-                        owner = conn.execute(owner_query, {"owner_id": unit.user_id}).fetchone()
-                
-                # INSERT NOTIFICATIONS
-                notifications_to_insert = []
-                
-                # Notification to assigned employee
-                if employee:
-                    if contract and tenant and tenant.user_type == 'T':
-                        notification_type = "App\\Notifications\\ComplaintAssigned"
-                        notification_title = "New Complaint Assigned"
-                        notification_body = f"A new complaint \"{complaint_title}\" has been assigned to you from {tenant.user_name} in unit {unit.unit_name if unit else 'N/A'}."
-                    else:
-                        notification_type = "App\\Notifications\\GeneralComplaintAssigned"
-                        notification_title = "New Complaint Assigned"
-                        notification_body = f"A new complaint \"{complaint_title}\" has been assigned to you."
-                    
-                    notification_data = {
-                        "title": notification_title,
-                        "body": notification_body,
-                        "type": "Complaint"
-                    }
-                    
-                    notifications_to_insert.append({
-                        "id": str(uuid.uuid4()),
-                        "type": notification_type,
-                        "notifiable_type": "App\\Models\\User",
-                        "notifiable_id": employee.user_id,
-                        "data": json.dumps(notification_data),
-                        "read_at": None,
-                        "created_at": datetime.now(),
-                        "updated_at": datetime.now()
-                    })
-                    
-                    print(f"✓ Notification created for employee: {employee.user_name}")
-                
-                # Notification to owner (if tenant complaint)
-                if owner and tenant and contract and unit:
-                    notification_title = "New Complaint From Tenant"
-                    notification_body = f"Your tenant {tenant.user_name} in unit {unit.unit_name} has submitted a complaint: \"{complaint_title}\"."
-                    
-                    notification_data = {
-                        "title": notification_title,
-                        "body": notification_body,
-                        "type": "Complaint"
-                    }
-                    
-                    notifications_to_insert.append({
-                        "id": str(uuid.uuid4()),
-                        "type": "App\\Notifications\\ComplaintFromTenant",
-                        "notifiable_type": "App\\Models\\User",
-                        "notifiable_id": owner.user_id,
-                        "data": json.dumps(notification_data),
-                        "read_at": None,
-                        "created_at": datetime.now(),
-                        "updated_at": datetime.now()
-                    })
-                    
-                    print(f"✓ Notification created for owner: {owner.user_name}")
-                
-                # Insert all notifications
-                if notifications_to_insert:
-                    insert_notification_query = text("""
-                        INSERT INTO notifications (id, type, notifiable_type, notifiable_id, data, read_at, created_at, updated_at)
-                        VALUES (:id, :type, :notifiable_type, :notifiable_id, :data, :read_at, :created_at, :updated_at)
-                    """)
-                    
-                    for notif in notifications_to_insert:
-                        conn.execute(insert_notification_query, notif)
-                    
-                    conn.commit()
-                    print(f"✓ Inserted {len(notifications_to_insert)} notifications into database")
-
-            # SEND EMAIL (same as before)
-            try:
-                if assigned_employee_email:
-                    first_pic_url = None
-                    if complaint_pictures and complaint_pictures.startswith("["):
-                        try:
-                            pics = json.loads(complaint_pictures)
-                            if pics:
-                                first_pic_url = pics[0]
-                        except Exception:
-                            pass
-
-                    badge_colors = {
-                        "Electricity failure": "#F59E0B",
-                        "Plumbing failure": "#3B82F6",
-                        "Technical failure": "#10B981",
-                        "Caretaker failure": "#EF4444",
-                    }
-                    badge_color = badge_colors.get(complaint_type, "#6B7280")
-
-                    subject = f"New Complaint #{complaint_id} • {complaint_type or 'Complaint'}"
-
-                    img_section = ""
-                    if first_pic_url:
-                        img_section = f"""
-                        <tr>
-                        <td style="padding-top:16px;">
-                            <div style="font-size:14px;color:#374151;margin-bottom:8px;">Photo</div>
-                            <img src="cid:complaint_photo" alt="Complaint photo" style="max-width:100%;border-radius:12px;border:1px solid #e5e7eb;">
-                            <div style="margin-top:8px;font-size:13px;">
-                            <a href="{first_pic_url}" target="_blank" style="color:#2563EB;text-decoration:none;">Open image in browser</a>
-                            </div>
-                        </td>
-                        </tr>
-                        """
-
-                    body = f"""
-                    <div style="background:#f8fafc;padding:24px;">
-                    <table role="presentation" cellpadding="0" cellspacing="0" width="100%" style="max-width:680px;margin:0 auto;background:#ffffff;border-radius:16px;border:1px solid #e5e7eb;box-shadow:0 1px 2px rgba(0,0,0,.04);">
-                        <tr>
-                        <td style="padding:24px 24px 8px 24px;">
-                            <div style="font-size:18px;font-weight:700;color:#111827;">New Complaint Assigned</div>
-                            <div style="margin-top:6px;font-size:13px;color:#6B7280;">Complaint #{complaint_id} • Building {building_id}</div>
-                            <span style="display:inline-block;margin-top:12px;padding:6px 10px;border-radius:999px;background:{badge_color};color:white;font-size:12px;font-weight:600;">
-                            {complaint_type or 'Complaint'}
-                            </span>
-                        </td>
-                        </tr>
-                        <tr>
-                        <td style="padding:8px 24px 24px 24px;">
-                            <table role="presentation" cellpadding="0" cellspacing="0" width="100%" style="border-collapse:separate;border-spacing:0 8px;">
-                            <tr>
-                                <td style="width:140px;font-size:13px;color:#6B7280;">Title</td>
-                                <td style="font-size:14px;color:#111827;font-weight:600;">{(complaint_title or '').strip()}</td>
-                            </tr>
-                            <tr>
-                                <td style="width:140px;font-size:13px;color:#6B7280;">Type</td>
-                                <td style="font-size:14px;color:#111827;">{complaint_type or '-'}</td>
-                            </tr>
-                            <tr>
-                                <td style="width:140px;font-size:13px;color:#6B7280;vertical-align:top;">Description</td>
-                                <td style="font-size:14px;color:#111827;line-height:1.5;">{(complaint_description or '').strip()}</td>
-                            </tr>
-                            </table>
-                            {img_section}
-                            <div style="margin-top:20px;">
-                            <a href="#" style="display:inline-block;background:#111827;color:#ffffff;text-decoration:none;padding:10px 14px;border-radius:10px;font-size:13px;font-weight:600;">Open in Dashboard</a>
-                            </div>
-                        </td>
-                        </tr>
-                    </table>
-                    <div style="max-width:680px;margin:10px auto 0;text-align:center;color:#9CA3AF;font-size:12px;">
-                        Sent by Building Bot
-                    </div>
-                    </div>
-                    """
-
-                    text_fallback = f"""New Complaint Assigned
-                Complaint #{complaint_id} - Building {building_id}
-                Type: {complaint_type or '-'}
-                Title: {(complaint_title or '').strip()}
-                Description: {(rephrased or '').strip()}
-                {('Photo: ' + first_pic_url) if first_pic_url else ''}"""
-
-                    employee_email_from_db = employee.email if employee and getattr(employee, "email", None) else None
-                    email_to_send = assigned_employee_email or employee_email_from_db
-
-                    if not email_to_send:
-                        raise ActionExecutionRejected(self.name(), "Assigned employee email is missing.")
-
-                    if EMAIL_PROVIDER == "smtp":
-                        resp = send_smtp_email(email_to_send, subject, body, text_fallback=text_fallback, image_url=first_pic_url)
-                    else:
-                        resp = send_onesignal_email(email_to_send, subject, body, include_unsubscribed=False)
-
-                    if not resp or not resp.get("ok", False):
-                        if EMAIL_PROVIDER != "smtp" and isinstance(resp, dict) and "id" in resp:
-                            pass
-                        else:
-                            err_msg = f"Email send failed via {EMAIL_PROVIDER}: {resp}"
-                            raise ActionExecutionRejected(self.name(), err_msg)
-
-                    print(f"✓ Email sent to {email_to_send} via {EMAIL_PROVIDER.upper()}")
-
-            except Exception as notify_err:
-                print(f"✗ Email notification error: {notify_err}")
+            email_payload = {
+                "complaint_id": complaint_id,
+                "complaint_title": complaint_title,
+                "complaint_description": complaint_description,
+                "rephrased": rephrased,
+                "complaint_type": complaint_type,
+                "complaint_pictures": complaint_pictures,
+                "building_id": building_id,
+                # "Default Staff" paths leave the slot empty: fall back to the employee's email in the DB
+                "assigned_employee_email": assigned_employee_email or ctx.employee_email,
+            }
+
+            # The complaint is saved: from here on, failures must not be reported as a failed save
+            email_queued = False
+            if BACKGROUND_JOBS:
+                # Reply right away; sentiment and email are retried by the job workers
+                if sentiment_score is None:
+                    enqueue_sentiment(complaint_id, complaint_description)
+                try:
+                    enqueue("complaint_email", email_payload)
+                    email_queued = True
+                except Exception as queue_err:
+                    print(f"✗ Could not queue email for complaint {complaint_id}, sending inline: {queue_err}")
+            if not email_queued:
+                try:
+                    send_complaint_email(**email_payload)
+                except Exception as notify_err:
+                    print(f"✗ Email notification error: {notify_err}")
 
             # Success message
             employee_msg = f" and assigned to {selected_employee_name}" if selected_employee_name else ""
             dispatcher.utter_message(
                 f"✅ Complaint #{complaint_id} submitted successfully{employee_msg}!\n"
-                f"📧 Notifications sent"
+                f"📧 Notifications {'on their way' if email_queued else 'sent'}"
             )
 
         except Exception as e:
@@ -703,12 +904,13 @@ from typing import Any, Text, Dict, List
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
 class ActionCheckComplaintStatus(Action):
     def name(self):
         return "action_check_complaint_status"
 
+    @run_in_thread
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: dict):
@@ -795,6 +997,7 @@ class ActionFetchEmployeesAndWait(Action):
     def name(self) -> Text:
         return "action_fetch_employees_and_wait"
 
+    @run_in_thread
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
         print("\n" + "="*50)
@@ -961,13 +1164,13 @@ class ActionSummarizeComplaint(Action):
     def name(self) -> Text:
         return "action_summarize_complaint"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
 
         title = tracker.get_slot("complaint_title")
         desc = tracker.get_slot("complaint_description")
         ctype = tracker.get_slot("complaint_type")
         image = tracker.get_slot("uploaded_image_url")
-        rephrased = get_rephrased_description(tracker)
+        rephrased = await get_rephrased_description(tracker)
         summary = "Here is what I understood about your complaint:\n\n"
         summary += f"📝 Title: {title or '-'}\n"
         summary += f"📖 Description: {rephrased or '-'}\n"
@@ -984,34 +1187,10 @@ class ActionProposeComplaintSolution(Action):
     OPTIMIZED: Faster RAG search with lazy loading
     """
     
-    # Class-level cache for KB (initialize once, reuse)
-    _kb_instance = None
-    
-    @classmethod
-    def get_kb(cls):
-        """Lazy load and cache KB instance"""
-        if cls._kb_instance is None:
-            try:
-                import sys
-                import os
-                from pathlib import Path
-                
-                project_root = Path(__file__).parent.parent
-                if str(project_root) not in sys.path:
-                    sys.path.insert(0, str(project_root))
-                
-                from rag.knowledge_base import ComplaintKnowledgeBase
-                cls._kb_instance = ComplaintKnowledgeBase(persist_directory="./chroma_db")
-                print("✅ KB initialized and cached")
-            except Exception as e:
-                print(f"⚠️ KB init failed: {e}")
-                cls._kb_instance = None
-        return cls._kb_instance
-    
     def name(self) -> Text:
         return "action_propose_complaint_solution"
     
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         import time
         start_time = time.time()
@@ -1030,7 +1209,8 @@ class ActionProposeComplaintSolution(Action):
                 if event.get("event") == "user":
                     md = event.get("metadata") or {}
                     if md.get("uploaded_image_url"):
-                        img = md["uploaded_image_url"]
+                        img = await asyncio.to_thread(preprocess_data_url, md["uploaded_image_url"])
+                        img = await asyncio.to_thread(stage_image, img)
                         dispatcher.utter_message(text="📷 Image received!")
                         break
         except Exception as e:
@@ -1046,7 +1226,10 @@ class ActionProposeComplaintSolution(Action):
         context = ""
         
         try:
-            kb = self.get_kb()  # Use cached instance!
+            # Model loading and encoding are CPU-bound; run them in a worker thread
+            if not kb_ready():
+                print(f"⏳ Waiting for KB ({kb_status()['state']})")
+            kb = await asyncio.to_thread(get_kb)  # Shared instance, see kb.py
             
             if kb:
                 search_start = time.time()
@@ -1057,7 +1240,8 @@ class ActionProposeComplaintSolution(Action):
                 search_query = f"{title}. {desc}"
                 type_for_search = ctype if ctype not in (None, "", "Unknown") else None
 
-                similar_complaints = kb.search_similar_complaints(
+                similar_complaints = await asyncio.to_thread(
+                    kb.search_similar_complaints,
                     query=search_query,
                     complaint_type=type_for_search,
                     top_k=3
@@ -1102,12 +1286,12 @@ Give a concise troubleshooting solution (max 150 chars)."""
         try:
             gpt_start = time.time()
             
-            completion = client.chat.completions.create(
+            completion = await chat_completion(
+                deadline=10,  # Hard deadline for the whole call
                 model="gpt-3.5-turbo",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.7,
                 max_tokens=100,  # Reduced for speed
-                timeout=10  # Add timeout
             )
             
             solution = completion.choices[0].message.content.strip()
@@ -1137,7 +1321,7 @@ class ActionExtractImageFromMetadata(Action):
     def name(self):
         return "action_extract_image_from_metadata"
 
-    def run(self, dispatcher, tracker, domain: Dict[Text, Any]) -> List[SlotSet]:
+    async def run(self, dispatcher, tracker, domain: Dict[Text, Any]) -> List[SlotSet]:
         events = tracker.events
         img_b64 = None
 
@@ -1158,9 +1342,14 @@ class ActionExtractImageFromMetadata(Action):
 
         dispatcher.utter_message(text="📷 Image received! Analyzing...")
 
+        # Downscale/recompress once here; analysis, slot storage and upload all use the result
+        img_b64 = await asyncio.to_thread(preprocess_data_url, img_b64)
+        # The slot only keeps a short reference to the staged bytes
+        image_ref = await asyncio.to_thread(stage_image, img_b64)
+
         analysis = None
         try:
-            analysis = analyze_complaint_image(img_b64)
+            analysis = await analyze_complaint_image(img_b64)
         except Exception as e:
             print(f"[Image analysis error] {e}")
 
@@ -1168,7 +1357,7 @@ class ActionExtractImageFromMetadata(Action):
             dispatcher.utter_message(text=f"🧾 Image notes:\n{analysis}")
 
         return [
-            SlotSet("uploaded_image_url", img_b64),
+            SlotSet("uploaded_image_url", image_ref),
             SlotSet("image_uploaded", True),
             SlotSet("image_analysis", analysis),
         ]
@@ -1179,46 +1368,36 @@ class ActionInferComplaintType(Action):
     def name(self) -> Text:
         return "action_infer_complaint_type"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         latest_text = tracker.latest_message.get("text", "")
         if not latest_text:
             return []
 
-        categories = [
-            "Electricity failure",
-            "Plumbing failure",
-            "Technical failure",
-            "Caretaker failure"
-        ]
-
-        prompt = f"""
-        Classify the following complaint into exactly one of these categories:
-        {", ".join(categories)}.
-
-        Category descriptions:
-        - "Electricity failure": Power outages, lights, electrical outlets, circuit breakers
-        - "Plumbing failure": Water leaks, drains, toilets, sinks, pipes, faucets
-        - "Technical failure": Heating, AC, elevators, door locks, appliances, ventilation
-        - "Caretaker failure": Cleaning, trash collection, maintenance service, common areas
-
-        Complaint: "{latest_text}"
+        # Local kNN over the labeled complaints in the KB; the LLM only when unsure.
+        # Never wait for a cold KB here: loading it takes far longer than the LLM call
+        try:
+            if not kb_ready():
+                print(f"[CLASSIFY] KB {kb_status()['state']}, using the LLM")
+                warm_up_in_background()   # no-op unless the KB is still cold
+            else:
+                complaint_type, result = await asyncio.to_thread(local_complaint_type, get_kb(), latest_text)
+                print(f"[CLASSIFY] local: {result['type']} ({result['confidence']:.2f}, "
+                      f"{result['neighbors']} neighbors)")
+                if complaint_type:
+                    return [SlotSet("complaint_type", complaint_type)]
+        except Exception as e:
+            print(f"[CLASSIFY] Local classifier error: {e}")
 
-        Answer with ONLY the exact category name from the list above.
-        """
+        if not CLASSIFIER_LLM_FALLBACK:
+            return []
 
         try:
-            response = openai.Completion.create(
-                model="gpt-3.5-turbo-instruct",
-                prompt=prompt,
-                max_tokens=10,
-                temperature=0
-            )
-            complaint_type = response.choices[0].text.strip()
+            complaint_type = await llm_complaint_type(latest_text)
         except Exception as e:
             print(f"[GPT ERROR] {e}")
             return []
 
-        if complaint_type in categories:
+        if complaint_type:
             return [SlotSet("complaint_type", complaint_type)]
         return []
 
@@ -1230,14 +1409,7 @@ class ActionValidateComplaintType(Action):
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         ctype = (tracker.get_slot("complaint_type") or "").strip()
 
-        allowed_types = {
-            "Electricity failure",
-            "Plumbing failure",
-            "Technical failure",
-            "Caretaker failure"
-        }
-
-        if ctype not in allowed_types:
+        if ctype not in COMPLAINT_TYPES:
             dispatcher.utter_message(
                 text="Please choose one of the categories: Electricity failure, Plumbing failure, Technical failure, or Caretaker failure."
             )
@@ -1249,12 +1421,13 @@ class ActionValidateComplaintType(Action):
 from typing import Any, Text, Dict, List
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
 class ActionListUserComplaints(Action):
     def name(self) -> Text:
         return "action_list_user_complaints"
 
+    @run_in_thread
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: dict) -> List[Dict[Text, Any]]:
@@ -1326,11 +1499,19 @@ class ActionListUserComplaints(Action):
             dispatcher.utter_message(text=f"⚠️ Error retrieving complaints: {str(e)}")
             return []
 
-def analyze_complaint_image(img_data_url: str) -> str:
+async def analyze_complaint_image(image: str) -> str:
     """
     Returns a short, complaint-relevant analysis.
-    img_data_url is a data:image/...;base64,... string.
+    image is a blob reference or a data:image/...;base64,... string;
+    results are cached by image content hash.
     """
+    cache_key = analysis_key(image, "gpt-4o-mini")
+    cached = vision_cache.get(cache_key)
+    if cached is not None:
+        print("[VISION] Analysis cache hit")
+        return cached
+
+    img_data_url = await asyncio.to_thread(image_data_url, image)
     prompt = (
         "You are analyzing an uploaded photo for a building maintenance complaint.\n"
         "Describe ONLY what is visible and relevant to maintenance.\n"
@@ -1338,7 +1519,7 @@ def analyze_complaint_image(img_data_url: str) -> str:
         "Output 2-4 bullet points max."
     )
 
-    resp = client.chat.completions.create(
+    resp = await chat_completion(
         model="gpt-4o-mini",
         temperature=0.2,
         max_tokens=200,
@@ -1352,8 +1533,11 @@ def analyze_complaint_image(img_data_url: str) -> str:
             }
         ],
     )
-    return (resp.choices[0].message.content or "").strip()
-def get_rephrased_description(tracker: Tracker) -> str:
+    analysis = (resp.choices[0].message.content or "").strip()
+    if analysis:
+        vision_cache.put(cache_key, analysis)
+    return analysis
+async def get_rephrased_description(tracker: Tracker) -> str:
     """
     Returns complaint_description_rephrased if already set,
     otherwise generates it once and returns it.
@@ -1366,46 +1550,68 @@ def get_rephrased_description(tracker: Tracker) -> str:
     if not raw:
         return ""
 
+    return await rephrase_description(raw)
+
+async def get_combined_enrichment(raw: str):
+    """
+    One LLM call returning both the rephrased description and the sentiment.
+    Returns (rephrased, sentiment_score) or None if the reply can't be parsed.
+    """
     prompt = (
-        "Rephrase the complaint into a concise, neutral, professional description.\n"
-        "Rules:\n"
-        "- 1–2 sentences\n"
-        "- max 400 characters\n"
-        "- remove emotions and personal details\n"
-        "- use different words than the original\n\n"
+        "For the maintenance complaint below:\n"
+        "1. Rephrase it into a concise, neutral, professional description "
+        "(1–2 sentences, max 400 characters, no emotions or personal details, "
+        "different words than the original).\n"
+        "2. Rate the sentiment of the original text from -1 (very negative) to +1 (very positive).\n\n"
         f"User text: {raw}\n\n"
-        'Return only JSON: {"description":"..."}'
+        'Return only JSON: {"description":"...","sentiment":0.0}'
     )
 
     try:
-        resp = client.chat.completions.create(
+        resp = await chat_completion(
             model="gpt-4o-mini",
-            temperature=0.3,
-            max_tokens=150,
+            temperature=0.2,
+            max_tokens=180,
             messages=[{"role": "user", "content": prompt}],
         )
-
         txt = (resp.choices[0].message.content or "").strip()
         m = re.search(r"\{.*\}", txt, re.DOTALL)
+        data = json.loads(m.group(0))
+        clean = (data.get("description") or "").strip()
+        score = float(data["sentiment"])
+        if not clean:
+            return None
+        return clean[:400], max(min(score, 1), -1)
+    except Exception as e:
+        print("[Enrichment error]", e)
+        return None
 
-        if m:
-            data = json.loads(m.group(0))
-            clean = (data.get("description") or "").strip()
-        else:
-            clean = txt.strip()
+async def get_complaint_enrichment(tracker: Tracker):
+    """
+    Returns (rephrased_description, sentiment_score) for the current complaint.
+    The two LLM calls run concurrently, or as one structured call when
+    COMBINED_ENRICHMENT=true (falling back to the two calls on a bad reply).
+    """
+    raw = (tracker.get_slot("complaint_description") or "").strip()
 
-        return clean[:400]
+    if COMBINED_ENRICHMENT and raw and not tracker.get_slot("complaint_description_rephrased"):
+        combined = await get_combined_enrichment(raw)
+        if combined:
+            return combined
+
+    rephrased, sentiment_score = await asyncio.gather(
+        get_rephrased_description(tracker),
+        get_sentiment_score(tracker.get_slot("complaint_description")),
+    )
+    return rephrased, sentiment_score
 
-    except Exception as e:
-        print("[Rephrase error]", e)
-        return raw[:400]
 class ActionValidateImageMatchesDescription(Action):
     def name(self) -> Text:
         return "action_validate_image_matches_description"
 
-    def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
-        img_b64 = tracker.get_slot("uploaded_image_url")
-        if not img_b64 or not isinstance(img_b64, str) or not img_b64.startswith("data:image/"):
+    async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+        image_ref = tracker.get_slot("uploaded_image_url")
+        if not has_image(image_ref):
             # no image -> treat as match and continue
             return [SlotSet("image_match", True), SlotSet("image_mismatch_reason", None)]
 
@@ -1421,11 +1627,22 @@ class ActionValidateImageMatchesDescription(Action):
         img_notes = tracker.get_slot("image_analysis")
         if not img_notes:
             try:
-                img_notes = analyze_complaint_image(img_b64)
+                img_notes = await analyze_complaint_image(image_ref)
             except Exception as e:
                 print("[validate_image] analysis failed:", e)
                 img_notes = ""
 
+        # Same photo + same description -> same verdict
+        verdict_key = match_key(image_ref, desc, "gpt-4o-mini")
+        verdict = vision_cache.get(verdict_key)
+        if verdict is not None:
+            print("[validate_image] Verdict cache hit")
+            return [
+                SlotSet("image_match", verdict["match"]),
+                SlotSet("image_mismatch_reason", verdict["reason"] if not verdict["match"] else None),
+                SlotSet("image_analysis", img_notes or tracker.get_slot("image_analysis")),
+            ]
+
         prompt = f"""
 You are checking whether a maintenance complaint PHOTO matches the complaint DESCRIPTION.
 
@@ -1447,7 +1664,7 @@ Rules:
 """
 
         try:
-            resp = client.chat.completions.create(
+            resp = await chat_completion(
                 model="gpt-4o-mini",
                 temperature=0.2,
                 max_tokens=120,
@@ -1459,6 +1676,8 @@ Rules:
 
             is_match = bool(data.get("match", True))
             reason = (data.get("reason") or "").strip()[:140]
+            if img_notes:
+                vision_cache.put(verdict_key, {"match": is_match, "reason": reason})
 
             return [
                 SlotSet("image_match", is_match),
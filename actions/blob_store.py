@@ -0,0 +1,82 @@
+# blob_store.py - Content-addressed local staging for complaint photos
+#
+# Tracker slots only carry a short "blob:<sha256>.<ext>" reference; the bytes
+# live here until the complaint is submitted and the photo goes to B2.
+
+import os
+import time
+import hashlib
+import threading
+
+# Blob Store Configuration
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "./blob_store")
+BLOB_STORE_MAX_AGE_HOURS = float(os.getenv("BLOB_STORE_MAX_AGE_HOURS", "48"))   # staged photos older than this are pruned
+
+REF_PREFIX = "blob:"
+_EXT = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp", "image/gif": "gif"}
+_MIME = {ext: mime for mime, ext in _EXT.items()}
+_PRUNE_EVERY_SECONDS = 600
+
+
+class BlobStore:
+    """Write-once files named by content hash, so re-uploads of one photo share a blob"""
+
+    def __init__(self, root: str, max_age_seconds: float):
+        self.root = root
+        self.max_age_seconds = max_age_seconds
+        self._last_prune = 0.0
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def put(self, blob: bytes, mime: str) -> str:
+        """Stage bytes and return their reference"""
+        name = f"{hashlib.sha256(blob).hexdigest()}.{_EXT.get(mime, 'bin')}"
+        path = self._path(name)
+        os.makedirs(self.root, exist_ok=True)
+        if os.path.exists(path):
+            os.utime(path)   # keep it from being pruned
+        else:
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+        self._maybe_prune()
+        return REF_PREFIX + name
+
+    def get(self, ref: str):
+        """Return (mime, bytes) for a reference, or None if it is unknown or pruned"""
+        name = os.path.basename(ref[len(REF_PREFIX):])
+        try:
+            with open(self._path(name), "rb") as f:
+                blob = f.read()
+        except OSError:
+            return None
+        return _MIME.get(name.rsplit(".", 1)[-1], "application/octet-stream"), blob
+
+    def _maybe_prune(self):
+        now = time.time()
+        with self._lock:
+            if now - self._last_prune < _PRUNE_EVERY_SECONDS:
+                return
+            self._last_prune = now
+
+        removed = 0
+        for name in os.listdir(self.root):
+            path = self._path(name)
+            try:
+                if now - os.path.getmtime(path) > self.max_age_seconds:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        if removed:
+            print(f"[BLOB] Pruned {removed} staged image(s)")
+
+
+def is_blob_ref(value) -> bool:
+    return isinstance(value, str) and value.startswith(REF_PREFIX)
+
+
+blob_store = BlobStore(BLOB_STORE_DIR, BLOB_STORE_MAX_AGE_HOURS * 3600)
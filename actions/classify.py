@@ -0,0 +1,58 @@
+# classify.py - Complaint type classification: local kNN first, LLM when unsure
+
+import os
+
+from .llm import text_completion
+
+# Classifier Configuration
+CLASSIFIER_TOP_K = int(os.getenv("CLASSIFIER_TOP_K", "15"))
+CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("CLASSIFIER_MIN_CONFIDENCE", "0.6"))   # winner's share of the vote
+CLASSIFIER_MIN_NEIGHBORS = int(os.getenv("CLASSIFIER_MIN_NEIGHBORS", "5"))
+CLASSIFIER_LLM_FALLBACK = os.getenv("CLASSIFIER_LLM_FALLBACK", "true").lower() == "true"
+
+COMPLAINT_TYPES = [
+    "Electricity failure",
+    "Plumbing failure",
+    "Technical failure",
+    "Caretaker failure"
+]
+
+
+def local_complaint_type(kb, text: str, exclude_ids=None):
+    """
+    Classify against the labeled complaints in the knowledge base.
+    Returns (type or None when not confident enough, result dict).
+    """
+    result = kb.classify_complaint_type(text, labels=COMPLAINT_TYPES, top_k=CLASSIFIER_TOP_K,
+                                        exclude_ids=exclude_ids)
+    confident = (result["type"] is not None
+                 and result["neighbors"] >= CLASSIFIER_MIN_NEIGHBORS
+                 and result["confidence"] >= CLASSIFIER_MIN_CONFIDENCE)
+    return (result["type"] if confident else None), result
+
+
+async def llm_complaint_type(text: str):
+    """Ask the LLM; returns one of COMPLAINT_TYPES or None"""
+    prompt = f"""
+        Classify the following complaint into exactly one of these categories:
+        {", ".join(COMPLAINT_TYPES)}.
+
+        Category descriptions:
+        - "Electricity failure": Power outages, lights, electrical outlets, circuit breakers
+        - "Plumbing failure": Water leaks, drains, toilets, sinks, pipes, faucets
+        - "Technical failure": Heating, AC, elevators, door locks, appliances, ventilation
+        - "Caretaker failure": Cleaning, trash collection, maintenance service, common areas
+
+        Complaint: "{text}"
+
+        Answer with ONLY the exact category name from the list above.
+        """
+
+    response = await text_completion(
+        model="gpt-3.5-turbo-instruct",
+        prompt=prompt,
+        max_tokens=10,
+        temperature=0
+    )
+    complaint_type = response.choices[0].text.strip()
+    return complaint_type if complaint_type in COMPLAINT_TYPES else None
@@ -0,0 +1,108 @@
+# db.py - Shared, pooled database engine for actions and scripts
+
+import os
+import threading
+
+from sqlalchemy import create_engine, event
+
+# Database Configuration
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = os.getenv("DB_PORT", "3306")
+DB_DATABASE = os.getenv("DB_DATABASE", "bms_ged")
+DB_USERNAME = os.getenv("DB_USERNAME", "root")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "")
+
+# Pool Configuration
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))        # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))      # below MySQL wait_timeout
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Timeouts
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+DB_READ_TIMEOUT = int(os.getenv("DB_READ_TIMEOUT", "30"))
+DB_WRITE_TIMEOUT = int(os.getenv("DB_WRITE_TIMEOUT", "30"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 = no server-side limit
+
+_engine = None
+_engine_lock = threading.Lock()
+_pool_events = {"connects": 0, "checkouts": 0, "checkins": 0, "invalidations": 0}
+
+
+def _count(name):
+    _pool_events[name] += 1
+
+
+def _on_connect(dbapi_conn, conn_record):
+    _count("connects")
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        # MySQL only enforces this for read-only SELECT statements
+        cursor = dbapi_conn.cursor()
+        try:
+            cursor.execute(f"SET SESSION max_execution_time = {DB_STATEMENT_TIMEOUT_MS}")
+        finally:
+            cursor.close()
+
+
+def _build_engine():
+    connection_string = f"mysql+pymysql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_DATABASE}"
+    engine = create_engine(
+        connection_string,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={
+            "connect_timeout": DB_CONNECT_TIMEOUT,
+            "read_timeout": DB_READ_TIMEOUT,
+            "write_timeout": DB_WRITE_TIMEOUT,
+        },
+    )
+
+    event.listen(engine, "connect", _on_connect)
+    event.listen(engine, "checkout", lambda *args: _count("checkouts"))
+    event.listen(engine, "checkin", lambda *args: _count("checkins"))
+    event.listen(engine, "invalidate", lambda *args: _count("invalidations"))
+
+    print(
+        f"[DB] Engine ready: {DB_HOST}:{DB_PORT}/{DB_DATABASE} "
+        f"(pool_size={DB_POOL_SIZE}, max_overflow={DB_MAX_OVERFLOW}, pre_ping={DB_POOL_PRE_PING})"
+    )
+    return engine
+
+
+def get_db_engine():
+    """Return the process-wide database engine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _build_engine()
+    return _engine
+
+
+def get_pool_stats():
+    """Return connection pool health metrics (empty dict before first use)"""
+    if _engine is None:
+        return {}
+
+    pool = _engine.pool
+    return {
+        "pool_size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        **_pool_events,
+    }
+
+
+def dispose_db_engine():
+    """Close all pooled connections (e.g. on shutdown or after fork)"""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+            print("[DB] Engine disposed")
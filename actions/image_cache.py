@@ -0,0 +1,109 @@
+# image_cache.py - Bounded cache of uploaded image bytes, keyed by B2 object key
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+# Image Cache Configuration
+IMAGE_CACHE_MAX_MB = float(os.getenv("IMAGE_CACHE_MAX_MB", "64"))
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR")                        # unset = memory only
+IMAGE_CACHE_DISK_MAX_MB = float(os.getenv("IMAGE_CACHE_DISK_MAX_MB", "512"))
+
+
+class ImageCache:
+    """
+    LRU of raw image bytes bounded by total size, optionally spilled to a
+    directory so background jobs still find the bytes after a restart.
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: str = None, disk_max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # key -> (mime, bytes)
+        self._size = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def put(self, key: str, blob: bytes, mime: str = None):
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key)[1])
+            if len(blob) <= self.max_bytes:
+                self._entries[key] = (mime, blob)
+                self._size += len(blob)
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+        if self.disk_dir:
+            try:
+                tmp_path = self._disk_path(key) + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(blob)
+                os.replace(tmp_path, self._disk_path(key))
+                self._prune_disk()
+            except OSError as e:
+                print(f"[IMG CACHE] Disk write failed: {e}")
+
+    def get(self, key: str):
+        """Return the cached bytes for an object key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    blob = f.read()
+                self.hits += 1
+                return blob
+            except OSError:
+                pass
+
+        self.misses += 1
+        return None
+
+    def _prune_disk(self):
+        files = [os.path.join(self.disk_dir, name) for name in os.listdir(self.disk_dir)]
+        files = sorted(((os.path.getmtime(p), os.path.getsize(p), p) for p in files if os.path.isfile(p)))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.disk_max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+
+def key_from_url(url: str, bucket: str = None) -> str:
+    """
+    Object key from a public bucket URL: virtual-host style
+    (https://<bucket>.s3.<region>.backblazeb2.com/<key>) or path style
+    (<endpoint>/<bucket>/<key>, custom S3 endpoints).
+    """
+    parsed = urlparse(url)
+    path = parsed.path.lstrip("/")
+    if bucket and not (parsed.hostname or "").startswith(f"{bucket}.") and path.startswith(f"{bucket}/"):
+        path = path[len(bucket) + 1:]
+    return path
+
+
+image_cache = ImageCache(
+    max_bytes=int(IMAGE_CACHE_MAX_MB * 1024 * 1024),
+    disk_dir=IMAGE_CACHE_DIR,
+    disk_max_bytes=int(IMAGE_CACHE_DISK_MAX_MB * 1024 * 1024),
+)
@@ -0,0 +1,103 @@
+# images.py - Downscale and recompress complaint photos once, on receipt
+
+import io
+import os
+import re
+import base64
+
+# Image Preprocessing Configuration
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1600"))   # longest side, pixels
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "webp").lower()              # 'webp' or 'jpeg'
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_THUMBNAIL_SIZE = int(os.getenv("IMAGE_THUMBNAIL_SIZE", "640"))
+
+_EXIF_ORIENTATION = 0x0112
+_FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+
+
+def _pil():
+    """Pillow is optional; without it images pass through unchanged"""
+    try:
+        from PIL import Image, ImageOps
+        return Image, ImageOps
+    except ImportError:
+        return None, None
+
+
+def _encode(img, max_dimension: int):
+    Image, _ = _pil()
+    pil_format, mime = _FORMATS.get(IMAGE_FORMAT, _FORMATS["webp"])
+
+    img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    if pil_format == "JPEG" and img.mode != "RGB":
+        # JPEG has no alpha: flatten onto white
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        rgba = img.convert("RGBA")
+        background.paste(rgba, mask=rgba.split()[-1])
+        img = background
+    elif img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+    out = io.BytesIO()
+    if pil_format == "JPEG":
+        img.save(out, "JPEG", quality=IMAGE_QUALITY, optimize=True, progressive=True)
+    else:
+        img.save(out, "WEBP", quality=IMAGE_QUALITY, method=4)
+    return mime, out.getvalue()
+
+
+def preprocess_image(blob: bytes, mime: str):
+    """
+    Apply EXIF orientation, downscale to IMAGE_MAX_DIMENSION and recompress
+    to IMAGE_FORMAT. Idempotent: already-processed images are returned as is.
+    Returns (mime, blob).
+    """
+    Image, ImageOps = _pil()
+    if Image is None:
+        return mime, blob
+
+    try:
+        with Image.open(io.BytesIO(blob)) as img:
+            rotated = img.getexif().get(_EXIF_ORIENTATION, 1) != 1
+            oversized = max(img.size) > IMAGE_MAX_DIMENSION
+            if not rotated and not oversized and mime == _FORMATS.get(IMAGE_FORMAT, _FORMATS["webp"])[1]:
+                return mime, blob
+
+            new_mime, new_blob = _encode(ImageOps.exif_transpose(img), IMAGE_MAX_DIMENSION)
+
+        if len(new_blob) >= len(blob) and not rotated and not oversized:
+            # Recompression didn't help; keep the original bytes
+            return mime, blob
+
+        print(f"[IMG] {mime} {len(blob) / 1024:.0f} KB -> {new_mime} {len(new_blob) / 1024:.0f} KB")
+        return new_mime, new_blob
+    except Exception as e:
+        print(f"[IMG] Preprocessing skipped: {e}")
+        return mime, blob
+
+
+def make_thumbnail(blob: bytes):
+    """Return (mime, bytes) of a IMAGE_THUMBNAIL_SIZE thumbnail, or None"""
+    Image, ImageOps = _pil()
+    if Image is None:
+        return None
+
+    try:
+        with Image.open(io.BytesIO(blob)) as img:
+            return _encode(ImageOps.exif_transpose(img), IMAGE_THUMBNAIL_SIZE)
+    except Exception as e:
+        print(f"[IMG] Thumbnail failed: {e}")
+        return None
+
+
+def preprocess_data_url(data_url: str) -> str:
+    """preprocess_image() for a data:image/...;base64,... string"""
+    m = re.match(r"^data:(image/\w+);base64,(.+)$", data_url or "", re.DOTALL)
+    if not m:
+        return data_url
+
+    mime, b64 = m.groups()
+    new_mime, new_blob = preprocess_image(base64.b64decode(b64), mime)
+    if new_mime == mime and len(new_blob) * 4 // 3 >= len(b64) - 3:
+        return data_url
+    return f"data:{new_mime};base64,{base64.b64encode(new_blob).decode('ascii')}"
@@ -0,0 +1,186 @@
+# jobs.py - Durable background job queue (SQLite-backed) for post-submit work
+
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+
+# Job Queue Configuration
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "./jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))   # doubles on every retry
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))          # 'running' jobs older than this are retried
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+
+_handlers = {}
+_local = threading.local()
+_workers = []
+_workers_lock = threading.Lock()
+_wakeup = threading.Event()
+
+
+def job_handler(kind: str):
+    """Register a sync or async function that processes jobs of `kind` (payload dict in)"""
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def _conn() -> sqlite3.Connection:
+    """One SQLite connection per thread"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(JOB_QUEUE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(JOB_QUEUE_PATH, isolation_level=None, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,          -- pending | running | done | failed
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                run_after REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_run_after ON jobs (status, run_after)")
+        _local.conn = conn
+    return conn
+
+
+def enqueue(kind: str, payload: dict, max_attempts: int = None) -> int:
+    """Persist a job and wake the workers; returns the job id"""
+    start_workers()
+    now = time.time()
+    cur = _conn().execute(
+        """
+        INSERT INTO jobs (kind, payload, status, attempts, max_attempts, run_after, created_at, updated_at)
+        VALUES (?, ?, 'pending', 0, ?, ?, ?, ?)
+        """,
+        (kind, json.dumps(payload, default=str), max_attempts or JOB_MAX_ATTEMPTS, now, now, now),
+    )
+    _wakeup.set()
+    print(f"[JOBS] Queued {kind} job #{cur.lastrowid}")
+    return cur.lastrowid
+
+
+def get_job(job_id: int):
+    """Return a job's status row as a dict, or None"""
+    row = _conn().execute(
+        "SELECT id, kind, status, attempts, max_attempts, last_error, created_at, updated_at FROM jobs WHERE id = ?",
+        (job_id,),
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def queue_stats():
+    """Job counts per status"""
+    rows = _conn().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+    return {row["status"]: row["n"] for row in rows}
+
+
+def _claim():
+    """Atomically take the next due job (or an expired lease) and mark it running"""
+    conn = _conn()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            """
+            SELECT * FROM jobs
+            WHERE (status = 'pending' AND run_after <= ?)
+               OR (status = 'running' AND updated_at <= ?)
+            ORDER BY run_after, id
+            LIMIT 1
+            """,
+            (now, now - JOB_LEASE_SECONDS),
+        ).fetchone()
+        if row:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (now, row["id"]),
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return row
+
+
+def _finish(job_id: int, status: str, error: str = None, run_after: float = None):
+    now = time.time()
+    _conn().execute(
+        "UPDATE jobs SET status = ?, last_error = ?, run_after = COALESCE(?, run_after), updated_at = ? WHERE id = ?",
+        (status, error, run_after, now, job_id),
+    )
+
+
+def _run(loop, job):
+    handler = _handlers.get(job["kind"])
+    if handler is None:
+        raise RuntimeError(f"No handler registered for job kind '{job['kind']}'")
+
+    payload = json.loads(job["payload"])
+    if asyncio.iscoroutinefunction(handler):
+        loop.run_until_complete(handler(payload))
+    else:
+        handler(payload)
+
+
+def _process(loop, job):
+    """Run a claimed job and record the outcome: done, retry with backoff, or failed"""
+    attempts = job["attempts"] + 1
+    try:
+        _run(loop, job)
+        _finish(job["id"], "done")
+        print(f"[JOBS] {job['kind']} job #{job['id']} done")
+    except Exception as e:
+        if attempts >= job["max_attempts"]:
+            _finish(job["id"], "failed", error=str(e))
+            print(f"[JOBS] {job['kind']} job #{job['id']} failed permanently: {e}")
+        else:
+            delay = JOB_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+            _finish(job["id"], "pending", error=str(e), run_after=time.time() + delay)
+            print(f"[JOBS] {job['kind']} job #{job['id']} attempt {attempts} failed, retrying in {delay:.0f}s: {e}")
+
+
+def _worker():
+    # Each worker keeps its own event loop for async handlers
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    while True:
+        try:
+            job = _claim()
+        except Exception as e:
+            print(f"[JOBS] Claim error: {e}")
+            time.sleep(JOB_POLL_SECONDS)
+            continue
+
+        if job is None:
+            _wakeup.wait(JOB_POLL_SECONDS)
+            _wakeup.clear()
+            continue
+
+        _process(loop, job)
+
+
+def start_workers():
+    """Start the worker pool once per process"""
+    with _workers_lock:
+        if _workers:
+            return
+        for i in range(JOB_WORKERS):
+            worker = threading.Thread(target=_worker, name=f"job-worker-{i}", daemon=True)
+            worker.start()
+            _workers.append(worker)
+        print(f"[JOBS] Started {JOB_WORKERS} worker(s) on {JOB_QUEUE_PATH}")
@@ -0,0 +1,81 @@
+# kb.py - The action server's handle on the shared ComplaintKnowledgeBase (see rag/registry.py),
+# loaded lazily or warmed in the background
+
+import os
+import sys
+import time
+import threading
+from pathlib import Path
+
+# Knowledge Base Configuration
+KB_PERSIST_DIRECTORY = os.getenv("KB_PERSIST_DIRECTORY", "./chroma_db")
+KB_WARMUP = os.getenv("KB_WARMUP", "true").lower() == "true"   # load in a background thread at startup
+
+_kb = None
+_kb_lock = threading.Lock()
+_status = {"state": "cold", "seconds": None, "error": None}
+
+
+def get_kb():
+    """Return the shared knowledge base, loading it on first use (None if it can't load)"""
+    global _kb
+    if _kb is not None:
+        return _kb
+
+    with _kb_lock:
+        if _kb is None:
+            _status["state"] = "loading"
+            start = time.perf_counter()
+            try:
+                project_root = Path(__file__).parent.parent
+                if str(project_root) not in sys.path:
+                    sys.path.insert(0, str(project_root))
+
+                from rag.registry import add_shutdown_hook, get_knowledge_base
+                _kb = get_knowledge_base(KB_PERSIST_DIRECTORY)
+                # However the registry is shut down (shutdown_kb, atexit), don't keep a closed KB
+                add_shutdown_hook(_reset)
+                _status.update(state="ready", seconds=time.perf_counter() - start)
+                print(f"✅ KB ready in {_status['seconds']:.1f}s")
+            except Exception as e:
+                _status.update(state="failed", seconds=time.perf_counter() - start, error=str(e))
+                print(f"⚠️ KB init failed: {e}")
+    return _kb
+
+
+def _reset():
+    # No _kb_lock: this may run at exit while a warm-up still holds it
+    global _kb
+    _kb = None
+    _status.update(state="cold", seconds=None, error=None)
+
+
+def shutdown_kb():
+    """Release the KB (and its model) explicitly, e.g. before a worker is recycled"""
+    if _kb is not None:
+        from rag.registry import shutdown_knowledge_bases
+        shutdown_knowledge_bases()   # calls _reset()
+
+
+def kb_ready() -> bool:
+    return _kb is not None
+
+
+def kb_status():
+    """{'state': cold|loading|ready|failed, 'seconds': load time, 'error': ...}"""
+    return dict(_status)
+
+
+def _warm_up():
+    kb = get_kb()
+    if kb is not None and kb.hybrid_search:
+        # Build the BM25 index now rather than on the first search
+        kb.build_lexical_index()
+
+
+def warm_up_in_background():
+    """Start loading the KB in a daemon thread so startup doesn't wait for it"""
+    if _status["state"] != "cold":
+        return
+    threading.Thread(target=_warm_up, name="kb-warmup", daemon=True).start()
+    print("🔄 Warming up RAG system in the background...")
@@ -0,0 +1,76 @@
+# llm.py - Shared async OpenAI client for the action server
+
+import os
+import asyncio
+import weakref
+
+# LLM Configuration
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20"))                  # default per-call deadline (seconds)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))    # in-flight calls per event loop
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "16"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+
+# The action server's loop and each background job worker's loop get their
+# own client and semaphore, since neither can be shared across event loops
+_loop_state = weakref.WeakKeyDictionary()
+
+
+def _build_client():
+    # Imported on the first LLM call rather than at action-server startup
+    import httpx
+    from openai import AsyncOpenAI
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+        ),
+        timeout=LLM_TIMEOUT,
+    )
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=http_client,
+        max_retries=LLM_MAX_RETRIES,
+        timeout=LLM_TIMEOUT,
+    )
+
+
+def _get_loop_state():
+    loop = asyncio.get_running_loop()
+    state = _loop_state.get(loop)
+    if state is None:
+        state = (_build_client(), asyncio.Semaphore(LLM_MAX_CONCURRENCY))
+        _loop_state[loop] = state
+    return state
+
+
+def get_async_client():
+    """Return the AsyncOpenAI client (one shared HTTP connection pool) for the running loop"""
+    return _get_loop_state()[0]
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    return _get_loop_state()[1]
+
+
+async def chat_completion(deadline: float = None, **kwargs):
+    """
+    Run one chat completion under the shared concurrency limit.
+    `deadline` (seconds) bounds the whole call, including retries and
+    time spent waiting for a free slot; raises asyncio.TimeoutError.
+    """
+    async def _call():
+        async with _get_semaphore():
+            return await get_async_client().chat.completions.create(**kwargs)
+
+    return await asyncio.wait_for(_call(), timeout=deadline or LLM_TIMEOUT)
+
+
+async def text_completion(deadline: float = None, **kwargs):
+    """Same as chat_completion() for the legacy completions endpoint"""
+    async def _call():
+        async with _get_semaphore():
+            return await get_async_client().completions.create(**kwargs)
+
+    return await asyncio.wait_for(_call(), timeout=deadline or LLM_TIMEOUT)
@@ -0,0 +1,48 @@
+# rephrase.py - Neutral, professional rewrite of a complaint description
+
+import re
+import json
+
+from .llm import chat_completion
+
+
+async def rephrase_description(raw: str, fallback: bool = True):
+    """
+    Returns the rephrased description (max 400 chars).
+    On error returns the truncated original, or None when fallback=False.
+    """
+    prompt = (
+        "Rephrase the complaint into a concise, neutral, professional description.\n"
+        "Rules:\n"
+        "- 1–2 sentences\n"
+        "- max 400 characters\n"
+        "- remove emotions and personal details\n"
+        "- use different words than the original\n\n"
+        f"User text: {raw}\n\n"
+        'Return only JSON: {"description":"..."}'
+    )
+
+    try:
+        resp = await chat_completion(
+            model="gpt-4o-mini",
+            temperature=0.3,
+            max_tokens=150,
+            messages=[{"role": "user", "content": prompt}],
+        )
+
+        txt = (resp.choices[0].message.content or "").strip()
+        m = re.search(r"\{.*\}", txt, re.DOTALL)
+
+        if m:
+            data = json.loads(m.group(0))
+            clean = (data.get("description") or "").strip()
+        else:
+            clean = txt.strip()
+
+        if not clean and not fallback:
+            return None
+        return clean[:400]
+
+    except Exception as e:
+        print("[Rephrase error]", e)
+        return raw[:400] if fallback else None
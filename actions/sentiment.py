@@ -0,0 +1,159 @@
+# sentiment.py - Pluggable sentiment scoring (-1 very negative .. +1 very positive)
+#
+# Backends (SENTIMENT_BACKEND):
+#   llm           one chat completion per text (default, the historical scale)
+#   lexicon       built-in EN/FR word list, no dependencies
+#   transformers  local Hugging Face classifier (SENTIMENT_MODEL)
+#   onnx          same model exported to ONNX Runtime via optimum
+#
+# The default stays 'llm' until a local backend passes
+# scripts/benchmark_sentiment.py against the stored LLM scores; switch the
+# default here (and re-score old rows) only after it does.
+
+import os
+import re
+import math
+import asyncio
+import threading
+from typing import List, Optional
+
+from .llm import chat_completion
+
+# Sentiment Configuration
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "llm").lower()
+SENTIMENT_MODEL = os.getenv("SENTIMENT_MODEL", "cardiffnlp/twitter-xlm-roberta-base-sentiment")
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "32"))
+
+# Tone words only: what a complaint is about (leak, outage, cold, panne...) is not
+# how the tenant feels about it, so topic and status words are left out
+_POSITIVE = {
+    # English
+    "good": 1.5, "great": 2.5, "excellent": 3.0, "thanks": 1.5, "thank": 1.5, "happy": 2.0,
+    "quick": 1.0, "fast": 1.0, "nice": 1.5, "perfect": 3.0, "appreciate": 2.0, "fine": 0.8, "ok": 0.5,
+    # French
+    "bien": 1.0, "bon": 1.0, "bonne": 1.0, "merci": 1.5, "parfait": 3.0, "rapide": 1.0, "content": 2.0,
+}
+_NEGATIVE = {
+    # English
+    "bad": -1.5, "terrible": -3.0, "awful": -3.0, "horrible": -3.0, "angry": -2.5,
+    "unacceptable": -3.0, "frustrated": -2.5, "frustrating": -2.5, "worst": -3.0, "disgusting": -3.0,
+    "annoyed": -2.0, "annoying": -2.0, "ridiculous": -2.5,
+    # French
+    "mauvais": -1.5, "inacceptable": -3.0, "marre": -2.5, "nul": -2.0, "énervé": -2.5,
+    "inadmissible": -3.0, "honteux": -3.0,
+}
+# "plus" is left out: it's usually "more", and in "ne ... plus" it follows the word it negates
+_NEGATIONS = {"not", "no", "never", "don't", "doesn't", "isn't", "wasn't", "won't", "can't",
+              "pas", "aucun", "aucune", "jamais"}
+_INTENSIFIERS = {"very": 1.5, "really": 1.4, "extremely": 1.8, "so": 1.3, "totally": 1.5,
+                 "très": 1.5, "vraiment": 1.4, "trop": 1.3, "complètement": 1.5}
+
+
+class LexiconSentiment:
+    """Word-list scorer with negation and intensifiers, normalized like VADER"""
+
+    def score_batch(self, texts: List[str]) -> List[float]:
+        return [self.score(t) for t in texts]
+
+    @staticmethod
+    def score(text_val: str) -> float:
+        words = re.findall(r"[\w'’]+", (text_val or "").lower())
+        total = 0.0
+        for i, word in enumerate(words):
+            value = _POSITIVE.get(word) or _NEGATIVE.get(word)
+            if not value:
+                continue
+            window = words[max(0, i - 3):i]
+            for w in window:
+                value *= _INTENSIFIERS.get(w, 1.0)
+            if any(w in _NEGATIONS for w in window):
+                value *= -0.5
+            total += value
+
+        exclamations = min((text_val or "").count("!"), 4)
+        if total:
+            total += math.copysign(0.3 * exclamations, total)
+        return max(min(total / math.sqrt(total * total + 15), 1.0), -1.0)
+
+
+class TransformersSentiment:
+    """Local sequence classifier; score = P(positive) - P(negative)"""
+
+    def __init__(self, model_name: str, onnx: bool = False):
+        from transformers import AutoTokenizer, pipeline
+
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if onnx:
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+            model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+        else:
+            from transformers import AutoModelForSequenceClassification
+            model = AutoModelForSequenceClassification.from_pretrained(model_name)
+
+        self._pipeline = pipeline("text-classification", model=model, tokenizer=tokenizer,
+                                  top_k=None, truncation=True)
+        self._lock = threading.Lock()
+
+    def score_batch(self, texts: List[str]) -> List[float]:
+        with self._lock:
+            outputs = self._pipeline([t or "" for t in texts], batch_size=SENTIMENT_BATCH_SIZE)
+
+        scores = []
+        for labels in outputs:
+            probs = {item["label"].lower(): item["score"] for item in labels}
+            positive = sum(p for label, p in probs.items() if label.startswith("pos"))
+            negative = sum(p for label, p in probs.items() if label.startswith("neg"))
+            scores.append(max(min(positive - negative, 1.0), -1.0))
+        return scores
+
+
+async def _llm_score(text_val: str) -> Optional[float]:
+    prompt = f"Rate the sentiment of this text from -1 (very negative) to +1 (very positive): {text_val}"
+    try:
+        response = await chat_completion(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=5,
+            temperature=0
+        )
+        m = re.search(r"[-+]?\d*\.?\d+", response.choices[0].message.content or "")
+        return max(min(float(m.group(0)), 1), -1)
+    except Exception as e:
+        print("Sentiment error:", e)
+        return None
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The configured local backend (None for 'llm'); falls back to the lexicon if the model can't load"""
+    global _backend
+    if SENTIMENT_BACKEND == "llm":
+        return None
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if SENTIMENT_BACKEND in ("transformers", "onnx"):
+                    try:
+                        _backend = TransformersSentiment(SENTIMENT_MODEL, onnx=SENTIMENT_BACKEND == "onnx")
+                        print(f"✅ Sentiment model loaded: {SENTIMENT_MODEL} ({SENTIMENT_BACKEND})")
+                    except Exception as e:
+                        print(f"⚠️ Sentiment model unavailable, using lexicon: {e}")
+                if _backend is None:
+                    _backend = LexiconSentiment()
+    return _backend
+
+
+async def sentiment_scores(texts: List[str]) -> List[Optional[float]]:
+    """Score many texts: one batched call for local backends, concurrent calls for the LLM; None = failed"""
+    if SENTIMENT_BACKEND == "llm":
+        return list(await asyncio.gather(*(_llm_score(t) for t in texts)))
+
+    try:
+        # Off the event loop: the first call may load the model
+        return await asyncio.to_thread(lambda: get_backend().score_batch(texts))
+    except Exception as e:
+        print("Sentiment error:", e)
+        return [None] * len(texts)
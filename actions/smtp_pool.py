@@ -0,0 +1,126 @@
+# smtp_pool.py - Keep-alive SMTP connection pool
+
+import ssl
+import time
+import smtplib
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+
+class SMTPConnectionPool:
+    """
+    Reuses authenticated SMTP connections instead of doing
+    connect + STARTTLS + EHLO + LOGIN for every email.
+    At most `max_connections` are open at once; idle ones are checked
+    with NOOP before reuse and dropped after `max_idle_seconds`.
+    """
+
+    def __init__(self, host: str, port: int, username: str = None, password: str = None,
+                 starttls: bool = True, max_connections: int = 4, timeout: float = 20,
+                 max_idle_seconds: float = 60):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.max_idle_seconds = max_idle_seconds
+        self.stats = {"connects": 0, "reuses": 0, "reconnects": 0, "sent": 0, "rejected": 0}
+        self._idle = []  # (server, last_used) pairs, most recent last
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def _count(self, name: str):
+        # Workers update the counters concurrently
+        with self._lock:
+            self.stats[name] += 1
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        server.ehlo()
+        if self.starttls:
+            server.starttls(context=ssl.create_default_context())
+            server.ehlo()
+        if self.username:
+            server.login(self.username, self.password)
+        self._count("connects")
+        return server
+
+    @staticmethod
+    def _quit(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    @staticmethod
+    def _is_alive(server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _acquire(self) -> smtplib.SMTP:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                server, last_used = self._idle.pop()
+
+            if time.monotonic() - last_used <= self.max_idle_seconds and self._is_alive(server):
+                self._count("reuses")
+                return server
+            self._quit(server)
+
+        return self._connect()
+
+    def _release(self, server: smtplib.SMTP):
+        with self._lock:
+            self._idle.append((server, time.monotonic()))
+
+    def _sendmail(self, server: smtplib.SMTP, from_addr: str, to_addrs: Sequence[str], payload: str) -> smtplib.SMTP:
+        """Send one message, reconnecting once if the server dropped us; returns the live connection"""
+        try:
+            server.sendmail(from_addr, list(to_addrs), payload)
+        except smtplib.SMTPServerDisconnected:
+            self._quit(server)
+            server = self._connect()
+            self._count("reconnects")
+            server.sendmail(from_addr, list(to_addrs), payload)
+        return server
+
+    def send_many(self, messages: List[Tuple[str, Sequence[str], str]]) -> List[Optional[str]]:
+        """
+        Send (from_addr, to_addrs, payload) messages over one pooled connection.
+        Returns one entry per message: None if accepted, else the rejection reason.
+        Connection-level failures raise.
+        """
+        results = []
+        with self._slots:
+            server = self._acquire()
+            try:
+                for from_addr, to_addrs, payload in messages:
+                    try:
+                        server = self._sendmail(server, from_addr, to_addrs, payload)
+                        self._count("sent")
+                        results.append(None)
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                        # Rejected message; the connection itself is still fine
+                        self._count("rejected")
+                        results.append(str(e))
+            except Exception:
+                self._quit(server)
+                raise
+            self._release(server)
+        return results
+
+    def send(self, from_addr: str, to_addrs: Sequence[str], payload: str):
+        error = self.send_many([(from_addr, to_addrs, payload)])[0]
+        if error:
+            raise smtplib.SMTPException(error)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self._quit(server)
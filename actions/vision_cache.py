@@ -0,0 +1,135 @@
+# vision_cache.py - Memoized image analyses and image/description verdicts
+#
+# Keyed by the SHA-256 of the (preprocessed) image bytes, so the same photo
+# never goes to the vision model twice, even across restarts.
+
+import os
+import re
+import json
+import base64
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from .blob_store import REF_PREFIX, is_blob_ref
+
+# Vision Cache Configuration
+VISION_CACHE_SIZE = int(os.getenv("VISION_CACHE_SIZE", "1024"))
+VISION_CACHE_PATH = os.getenv("VISION_CACHE_PATH", "./vision_cache.sqlite3")   # empty = memory only
+
+
+class VisionCache:
+    """
+    LRU of JSON-serializable results, optionally backed by SQLite.
+    The database is opened on first use; if it can't be opened or written,
+    the cache carries on in memory only.
+    """
+
+    def __init__(self, max_size: int = 1024, persist_path: str = None):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._persist_path = persist_path
+
+    def _connection(self):
+        """The SQLite connection, opened on first use (None = memory only); call with the lock held"""
+        if self._db is None and self._persist_path:
+            try:
+                os.makedirs(os.path.dirname(self._persist_path) or ".", exist_ok=True)
+                db = sqlite3.connect(self._persist_path, check_same_thread=False)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS vision_results (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+                )
+                db.commit()
+                self._db = db
+            except (OSError, sqlite3.Error) as e:
+                print(f"[VISION CACHE] Can't open {self._persist_path}, using memory only: {e}")
+                self._persist_path = None
+        return self._db
+
+    def _disable_persistence(self, error):
+        print(f"[VISION CACHE] SQLite error, using memory only: {error}")
+        try:
+            self._db.close()
+        except Exception:
+            pass
+        self._db = None
+        self._persist_path = None
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            db = self._connection()
+            if db is not None:
+                try:
+                    row = db.execute("SELECT value FROM vision_results WHERE key = ?", (key,)).fetchone()
+                except sqlite3.Error as e:
+                    self._disable_persistence(e)
+                    row = None
+                if row:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self.hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value):
+        with self._lock:
+            self._remember(key, value)
+            db = self._connection()
+            if db is not None:
+                try:
+                    db.execute(
+                        "INSERT OR REPLACE INTO vision_results (key, value) VALUES (?, ?)",
+                        (key, json.dumps(value)),
+                    )
+                    db.commit()
+                except sqlite3.Error as e:
+                    self._disable_persistence(e)
+
+    def _remember(self, key: str, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "persistent": bool(self._persist_path),
+        }
+
+
+def image_key(image: str) -> str:
+    """SHA-256 of the image bytes; free for blob references, which are already content-addressed"""
+    if is_blob_ref(image):
+        return image[len(REF_PREFIX):].split(".", 1)[0]
+    b64 = image.split(",", 1)[-1]
+    return hashlib.sha256(base64.b64decode(b64)).hexdigest()
+
+
+def analysis_key(image: str, model: str) -> str:
+    return f"analysis:{model}:{image_key(image)}"
+
+
+def match_key(image: str, description: str, model: str) -> str:
+    text_hash = hashlib.sha1(re.sub(r"\s+", " ", description.strip().lower()).encode("utf-8")).hexdigest()
+    return f"match:{model}:{image_key(image)}:{text_hash}"
+
+
+vision_cache = VisionCache(VISION_CACHE_SIZE, VISION_CACHE_PATH or None)
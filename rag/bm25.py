@@ -0,0 +1,143 @@
+from collections import Counter, defaultdict
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+import heapq
+import math
+import re
+import threading
+import time
+
+# Function words (EN/FR, like the complaints) that match most documents and
+# rank nothing; scoring their postings is what makes a query slow
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have i in is it its my of on or our so that the their
+there this to was we were with you your me he she they them been do does did not no can will
+le la les un une des du de d l et ou en au aux dans sur pour par avec sans ce cet cette ces
+est sont a ai il elle ils elles je j nous vous on qui que qu ne pas se sa son ses mon ma mes
+""".split())
+
+# Every DEADLINE_CHECK_EVERY postings the deadline is checked again
+DEADLINE_CHECK_EVERY = 512
+
+
+class BM25Index:
+    """
+    In-memory inverted index scored with Okapi BM25, kept next to the Chroma
+    collection so exact terms (breaker model numbers, "elevator B", unit
+    codes) can be matched even when the embedding misses them.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, min_idf: float = 0.2):
+        self.k1 = k1
+        self.b = b
+        self.min_idf = min_idf   # terms in more than ~80% of documents carry no signal
+        self._postings = defaultdict(dict)   # term -> {doc_id: term frequency}
+        self._doc_terms = {}                 # doc_id -> Counter, for updates/removals
+        self._doc_type = {}                  # doc_id -> complaint_type, for filtered search
+        self._doc_length = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """Lowercased words; codes like 'qo-120' or 'b2/3' are kept whole and also split"""
+        tokens = []
+        for token in re.findall(r"\w+(?:[-/.]\w+)*", (text or "").lower()):
+            tokens.append(token)
+            if any(sep in token for sep in "-/."):
+                tokens.extend(part for part in re.split(r"[-/.]", token) if part)
+        return tokens
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def upsert(self, doc_id: str, text: str, complaint_type: str = None):
+        terms = Counter(self.tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            for term, tf in terms.items():
+                self._postings[term][doc_id] = tf
+            self._doc_terms[doc_id] = terms
+            self._doc_type[doc_id] = complaint_type
+            self._doc_length[doc_id] = sum(terms.values())
+            self._total_length += self._doc_length[doc_id]
+
+    def upsert_many(self, entries: Iterable[Tuple[str, str, Optional[str]]]):
+        for doc_id, text, complaint_type in entries:
+            self.upsert(doc_id, text, complaint_type)
+
+    def remove(self, doc_ids: Iterable[str]):
+        with self._lock:
+            for doc_id in doc_ids:
+                self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._doc_type.pop(doc_id, None)
+        self._total_length -= self._doc_length.pop(doc_id, 0)
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_type.clear()
+            self._doc_length.clear()
+            self._total_length = 0
+
+    def search(self, query: str, top_k: int = 10, complaint_type: str = None,
+               deadline: float = None) -> Optional[List[Tuple[str, float]]]:
+        """
+        Return [(doc_id, score)] best first, or None if `deadline`
+        (a time.perf_counter() value) passed before scoring finished.
+        Stopwords and terms with an IDF below min_idf are skipped; the
+        remaining terms are scored rarest first.
+        """
+        terms = set(self.tokenize(query)) - STOPWORDS
+        scores: Dict[str, float] = defaultdict(float)
+
+        with self._lock:
+            n = len(self._doc_terms)
+            if not n or not terms:
+                return []
+            avg_length = self._total_length / n
+
+            weighted = []
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                if idf >= self.min_idf:
+                    weighted.append((idf, postings))
+            weighted.sort(key=lambda item: len(item[1]))
+
+            k1, b = self.k1, self.b
+            doc_length, doc_type = self._doc_length, self._doc_type
+            for idf, postings in weighted:
+                weight = idf * (k1 + 1)
+                items = iter(postings.items())
+                # Score in slices so a long posting list can't overrun the deadline
+                while True:
+                    if deadline is not None and time.perf_counter() > deadline:
+                        return None
+                    chunk = list(islice(items, DEADLINE_CHECK_EVERY))
+                    if not chunk:
+                        break
+                    for doc_id, tf in chunk:
+                        if complaint_type and doc_type.get(doc_id) != complaint_type:
+                            continue
+                        norm = tf + k1 * (1 - b + b * doc_length[doc_id] / avg_length)
+                        scores[doc_id] += weight * tf / norm
+
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def stats(self) -> Dict:
+        return {"documents": len(self._doc_terms), "terms": len(self._postings)}
@@ -0,0 +1,145 @@
+from typing import List, Optional
+import os
+import threading
+
+import numpy as np
+
+# Embedding backend: 'torch' (sentence-transformers), 'onnx' (fp32) or 'onnx-int8'
+EMBEDDING_BACKEND = os.getenv("KB_EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_MODEL = os.getenv("KB_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+ONNX_MODEL_FILE = os.getenv("KB_ONNX_MODEL_FILE")   # overrides the file picked for the backend/host
+ONNX_THREADS = int(os.getenv("KB_ONNX_THREADS", "0"))   # 0 = onnxruntime default
+
+# Exports published in the model repo's onnx/ folder; onnx-int8 is picked per host
+_ONNX_FILES = {
+    "onnx": "onnx/model.onnx",
+    "onnx-int8": None,
+}
+_INT8_FILES = {
+    "arm64": "onnx/model_qint8_arm64.onnx",
+    "avx512_vnni": "onnx/model_qint8_avx512_vnni.onnx",
+    "avx512": "onnx/model_qint8_avx512.onnx",
+    "avx2": "onnx/model_quint8_avx2.onnx",   # also the fallback: runs on any x86-64 onnxruntime supports
+}
+_MAX_SEQ_LENGTH = 256   # all-MiniLM-L6-v2's max_seq_length
+
+
+def _cpu_flags() -> set:
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return set(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+
+def int8_model_file(machine: str = None, flags: set = None) -> str:
+    """Quantized export matching this CPU: arm64, AVX-512 VNNI, AVX-512, else AVX2"""
+    import platform
+    machine = (machine or platform.machine()).lower()
+    if machine in ("arm64", "aarch64"):
+        return _INT8_FILES["arm64"]
+    flags = _cpu_flags() if flags is None else flags
+    if "avx512_vnni" in flags or "avx512vnni" in flags:
+        return _INT8_FILES["avx512_vnni"]
+    if "avx512bw" in flags:
+        return _INT8_FILES["avx512"]
+    return _INT8_FILES["avx2"]
+
+
+def _snapshot_file(model_name: str, filename: str) -> str:
+    """Path to a model file, from the local HF cache when present (no network round trip on startup)"""
+    from huggingface_hub import hf_hub_download
+    try:
+        return hf_hub_download(model_name, filename, local_files_only=True)
+    except Exception:
+        return hf_hub_download(model_name, filename)
+
+
+class OnnxEmbedder:
+    """
+    Same model and pooling as SentenceTransformer (mean pooling + L2
+    normalization), run with onnxruntime and tokenizers only: no torch.
+    Exposes the subset of SentenceTransformer.encode() the KB uses.
+    """
+
+    def __init__(self, model_name: str, model_file: str):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_file = model_file
+        self.tokenizer = Tokenizer.from_file(_snapshot_file(model_name, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=_MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if ONNX_THREADS:
+            options.intra_op_num_threads = ONNX_THREADS
+        self.session = ort.InferenceSession(_snapshot_file(model_name, model_file), options,
+                                            providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def encode(self, sentences, batch_size: int = 32, show_progress_bar: bool = False, **_) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = np.vstack([self._encode_batch(texts[i:i + batch_size])
+                             for i in range(0, len(texts), batch_size)])
+        return vectors[0] if single else vectors
+
+
+def load_embedder(backend: Optional[str] = None, model_name: Optional[str] = None):
+    """Build the embedding model for a backend; heavy imports happen here, not at module import"""
+    backend = (backend or EMBEDDING_BACKEND).lower()
+    model_name = model_name or EMBEDDING_MODEL
+
+    if backend in _ONNX_FILES:
+        model_file = ONNX_MODEL_FILE or _ONNX_FILES[backend] or int8_model_file()
+        model = OnnxEmbedder(model_name, model_file)
+    elif backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        try:
+            # Cached snapshot first: skips the hub lookups on every cold start
+            model = SentenceTransformer(model_name, local_files_only=True)
+        except Exception:
+            model = SentenceTransformer(model_name)
+    else:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+
+    detail = f"{backend}, {model.model_file}" if backend in _ONNX_FILES else backend
+    print(f"✅ Embedding model loaded: {model_name} ({detail})")
+    return model
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_embedder(backend: Optional[str] = None, model_name: Optional[str] = None):
+    """One model per (backend, model) per process, however many knowledge bases use it"""
+    key = ((backend or EMBEDDING_BACKEND).lower(), model_name or EMBEDDING_MODEL)
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = load_embedder(*key)
+        return _shared[key]
+
+
+def release_shared_embedders():
+    with _shared_lock:
+        _shared.clear()
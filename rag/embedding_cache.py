@@ -0,0 +1,113 @@
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+
+
+class EmbeddingCache:
+    """
+    LRU cache of embeddings keyed by a hash of the normalized text,
+    optionally backed by a SQLite file so it survives restarts.
+    """
+
+    def __init__(self, max_size: int = 4096, persist_path: Optional[str] = None):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if persist_path:
+            os.makedirs(os.path.dirname(persist_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        # all-MiniLM-L6-v2 is uncased, so lowercasing and collapsing
+        # whitespace does not change the embedding
+        return re.sub(r"\s+", " ", (text or "").strip().lower())
+
+    @classmethod
+    def key(cls, text: str) -> str:
+        return hashlib.sha1(cls.normalize(text).encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Return cached vectors (None for misses) in the order of texts"""
+        keys = [self.key(t) for t in texts]
+        found = {}
+
+        with self._lock:
+            for k in keys:
+                if k in self._entries:
+                    self._entries.move_to_end(k)
+                    found[k] = self._entries[k]
+
+            missing = [k for k in set(keys) if k not in found]
+            if missing and self._db is not None:
+                placeholders = ",".join("?" * len(missing))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", missing
+                ).fetchall()
+                for k, blob in rows:
+                    vector = array("f", blob).tolist()
+                    found[k] = vector
+                    self._remember(k, vector)
+
+            for k in keys:
+                if k in found:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+
+        return [found.get(k) for k in keys]
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        entries = [(self.key(t), list(v)) for t, v in zip(texts, vectors)]
+        with self._lock:
+            for k, vector in entries:
+                self._remember(k, vector)
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(k, array("f", vector).tobytes()) for k, vector in entries]
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, vector: List[float]):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "persistent": self._db is not None
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -1,11 +1,29 @@
 import chromadb
 from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict
-import uuid
+from rag.embedders import EMBEDDING_BACKEND, get_shared_embedder
+from rag.bm25 import BM25Index
+from rag.embedding_cache import EmbeddingCache
+from rag.result_cache import ResultCache
+from typing import List, Dict, Iterable, Optional
+import numpy as np
+import hashlib
+import os
+import queue
+import threading
+import time
+
+# Hybrid retrieval: BM25 over the same documents, fused with the vector hits
+HYBRID_SEARCH = os.getenv("KB_HYBRID_SEARCH", "true").lower() == "true"
+LEXICAL_BUDGET_MS = float(os.getenv("KB_LEXICAL_BUDGET_MS", "50"))   # over budget -> vector-only results
+RRF_K = int(os.getenv("KB_RRF_K", "60"))
+# Keep query/document embeddings in SQLite next to the index, across restarts
+PERSIST_EMBEDDING_CACHE = os.getenv("KB_EMBEDDING_CACHE_PERSIST", "false").lower() == "true"
 
 class ComplaintKnowledgeBase:
-    def __init__(self, persist_directory="./chroma_db"):
+    def __init__(self, persist_directory="./chroma_db", embedding_cache_size: int = 4096,
+                 persist_embedding_cache: bool = None, result_cache_size: int = 256,
+                 result_cache_ttl: float = 300, embedding_backend: str = None,
+                 hybrid_search: bool = None):
         """Initialize ChromaDB for storing complaint knowledge"""
         
         # Initialize ChromaDB client with persistence
@@ -17,90 +35,601 @@ class ComplaintKnowledgeBase:
             metadata={"hnsw:space": "cosine"}
         )
         
-        # Use embedding model to convert text to vectors
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        # Use embedding model to convert text to vectors (torch, onnx or onnx-int8)
+        self.embedding_backend = (embedding_backend or EMBEDDING_BACKEND).lower()
+        self.embedding_model = get_shared_embedder(self.embedding_backend)
+        
+        # Shared by search and ingestion; optionally persisted next to the index.
+        # Backends don't produce bit-identical vectors, so each keeps its own file
+        if persist_embedding_cache is None:
+            persist_embedding_cache = PERSIST_EMBEDDING_CACHE
+        cache_file = ("embedding_cache.sqlite3" if self.embedding_backend == "torch"
+                      else f"embedding_cache.{self.embedding_backend}.sqlite3")
+        self.embedding_cache = EmbeddingCache(
+            max_size=embedding_cache_size,
+            persist_path=os.path.join(persist_directory, cache_file)
+            if persist_embedding_cache else None
+        )
+        
+        # Search results, invalidated whenever the collection changes
+        self.result_cache = ResultCache(max_size=result_cache_size, ttl_seconds=result_cache_ttl)
+        
+        # Lexical index, built from the collection in the background on first use
+        self.hybrid_search = HYBRID_SEARCH if hybrid_search is None else hybrid_search
+        self.lexical_index = BM25Index()
+        self._lexical_state = "empty"   # empty | building | ready
+        self._lexical_removed = set()   # deletes seen while building
+        self._lexical_lock = threading.Lock()
         
         print(f"✅ ChromaDB initialized at: {persist_directory}")
         print(f"✅ Collection 'complaint_solutions' ready")
         
+    @staticmethod
+    def _build_document(title: str, description: str, complaint_type: str, solution: str) -> str:
+        """Combine all text for better semantic search"""
+        return f"Type: {complaint_type}\nTitle: {title}\nDescription: {description}\nSolution: {solution}"
+
+    @staticmethod
+    def _build_metadata(title: str, description: str, complaint_id, complaint_type: str,
+                        solution: str, status: str, content_hash: str) -> Dict:
+        return {
+            "complaint_id": complaint_id,
+            "title": title,
+            "description": description,
+            "complaint_type": complaint_type,
+            "solution": solution,
+            "status": status,
+            "content_hash": content_hash
+        }
+
+    @staticmethod
+    def _doc_id(complaint_id) -> str:
+        """Deterministic ChromaDB id, one entry per complaint"""
+        return f"complaint_{complaint_id}"
+
+    @staticmethod
+    def _content_hash(document: str, status: str) -> str:
+        return hashlib.sha256(f"{status}\n{document}".encode("utf-8")).hexdigest()
+
+    def _unchanged_ids(self, hashes: Dict[str, str]) -> set:
+        """Return ids already stored with the same content hash"""
+        existing = self.collection.get(ids=list(hashes.keys()), include=["metadatas"])
+        return {
+            doc_id
+            for doc_id, metadata in zip(existing["ids"], existing["metadatas"])
+            if metadata and metadata.get("content_hash") == hashes[doc_id]
+        }
+
     def add_complaint(self, title: str, description: str, complaint_id: int, 
                      complaint_type: str, solution: str, status: str = "resolved"):
-        """Add a resolved complaint to the knowledge base"""
+        """Add (or update) a resolved complaint in the knowledge base"""
         
-        # Combine all text for better semantic search
-        combined_text = f"Type: {complaint_type}\nTitle: {title}\nDescription: {description}\nSolution: {solution}"
+        combined_text = self._build_document(title, description, complaint_type, solution)
+        doc_id = self._doc_id(complaint_id)
+        content_hash = self._content_hash(combined_text, status)
         
-        # Generate embedding (convert text to vector)
-        embedding = self.embedding_model.encode(combined_text).tolist()
-        
-        # Store in ChromaDB
         try:
-            self.collection.add(
+            # Skip re-embedding if nothing changed since the last run
+            if self._unchanged_ids({doc_id: content_hash}):
+                print(f"⏭️ Complaint {complaint_id} unchanged, skipping")
+                return
+            
+            # Generate embedding (convert text to vector)
+            embedding = self._encode_documents([combined_text])[0]
+            
+            # Store in ChromaDB (upsert keeps one entry per complaint)
+            self.collection.upsert(
                 documents=[combined_text],
                 embeddings=[embedding],
-                metadatas=[{
-                    "complaint_id": complaint_id,
-                    "title": title,
-                    "description": description,
-                    "complaint_type": complaint_type,
-                    "solution": solution,
-                    "status": status
-                }],
-                ids=[f"complaint_{complaint_id}_{uuid.uuid4().hex[:8]}"]
+                metadatas=[self._build_metadata(title, description, complaint_id,
+                                                complaint_type, solution, status, content_hash)],
+                ids=[doc_id]
             )
+            self._after_write([doc_id], [combined_text], [{"complaint_type": complaint_type}])
             print(f"✅ Added complaint {complaint_id} to knowledge base")
         except Exception as e:
             print(f"❌ Error adding complaint {complaint_id}: {e}")
-    
-    def search_similar_complaints(self, query: str, complaint_type: str = None, top_k: int = 3) -> List[Dict]:
-        """Search for similar past complaints using semantic search"""
-        
-        # Generate query embedding
-        query_embedding = self.embedding_model.encode(query).tolist()
-        
-        # Build where filter for complaint type
-        where_filter = None
-        if complaint_type:
-            where_filter = {"complaint_type": complaint_type}
-        
-        # Search in ChromaDB
-        try:
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=top_k,
-                where=where_filter
+
+    def _prepare_batch(self, complaints: List[Dict]):
+        """
+        Build documents/metadata for a batch and drop unchanged complaints.
+        Returns (ids, documents, metadatas, skipped_count).
+        """
+        # Later rows win if the same complaint appears twice in one batch
+        pending = {}
+        for c in complaints:
+            status = c.get("status", "resolved")
+            document = self._build_document(
+                c["title"], c["description"], c["complaint_type"], c["solution"])
+            content_hash = self._content_hash(document, status)
+            pending[self._doc_id(c["complaint_id"])] = (
+                document,
+                self._build_metadata(c["title"], c["description"], c["complaint_id"],
+                                     c["complaint_type"], c["solution"], status, content_hash)
             )
-            
-            # Format results
-            similar_complaints = []
-            if results['metadatas'] and len(results['metadatas'][0]) > 0:
-                for i, metadata in enumerate(results['metadatas'][0]):
-                    # Calculate similarity score (1 - distance)
-                    similarity = 1 - results['distances'][0][i] if results['distances'] else 0
-                    
-                    similar_complaints.append({
-                        "complaint_id": metadata.get("complaint_id"),
-                        "title": metadata.get("title"),
-                        "description": metadata.get("description"),
-                        "type": metadata.get("complaint_type"),
-                        "solution": metadata.get("solution"),
-                        "similarity_score": similarity
-                    })
-            
-            print(f"🔍 Found {len(similar_complaints)} similar complaints")
-            return similar_complaints
-            
+
+        unchanged = self._unchanged_ids(
+            {doc_id: md["content_hash"] for doc_id, (_, md) in pending.items()})
+        ids = [doc_id for doc_id in pending if doc_id not in unchanged]
+        return (ids,
+                [pending[doc_id][0] for doc_id in ids],
+                [pending[doc_id][1] for doc_id in ids],
+                len(unchanged))
+
+    def _encode_documents(self, documents: List[str], encode_batch_size: int = 32) -> List[List[float]]:
+        """Encode texts, reusing cached embeddings and encoding only the misses"""
+        embeddings = self.embedding_cache.get_many(documents)
+        missing = list(dict.fromkeys(
+            doc for doc, emb in zip(documents, embeddings) if emb is None))
+
+        if missing:
+            encoded = self.embedding_model.encode(
+                missing,
+                batch_size=encode_batch_size,
+                show_progress_bar=False
+            ).tolist()
+            self.embedding_cache.put_many(missing, encoded)
+            by_text = dict(zip(missing, encoded))
+            embeddings = [emb if emb is not None else by_text[doc]
+                          for doc, emb in zip(documents, embeddings)]
+
+        return embeddings
+
+    def _after_write(self, ids: List[str], documents: List[str], metadatas: List[Dict]):
+        """Keep the result cache and the lexical index in step with the collection"""
+        self.result_cache.invalidate()
+        if self._lexical_state != "empty":
+            self.lexical_index.upsert_many(
+                (doc_id, document, (metadata or {}).get("complaint_type"))
+                for doc_id, document, metadata in zip(ids, documents, metadatas))
+
+    def _after_delete(self, ids: List[str]):
+        self.result_cache.invalidate()
+        if self._lexical_state != "empty":
+            with self._lexical_lock:
+                if self._lexical_state == "building":
+                    self._lexical_removed.update(ids)
+            self.lexical_index.remove(ids)
+
+    def _claim_lexical_build(self) -> bool:
+        with self._lexical_lock:
+            if self._lexical_state == "building":
+                return False
+            self._lexical_state = "building"
+            self._lexical_removed = set()
+            return True
+
+    def build_lexical_index(self, page_size: int = 1000):
+        """(Re)build the BM25 index from the documents stored in the collection"""
+        if self._claim_lexical_build():
+            self._load_lexical_index(page_size)
+
+    def _load_lexical_index(self, page_size: int = 1000):
+        start = time.time()
+        try:
+            offset = 0
+            while True:
+                page = self.collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+                if not page["ids"]:
+                    break
+                with self._lexical_lock:
+                    removed = set(self._lexical_removed)
+                self.lexical_index.upsert_many(
+                    (doc_id, document, (metadata or {}).get("complaint_type"))
+                    for doc_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"])
+                    if doc_id not in removed)
+                offset += page_size
+        except Exception as e:
+            with self._lexical_lock:
+                self._lexical_state = "empty"
+            self.lexical_index.clear()
+            print(f"❌ Error building lexical index: {e}")
+            return
+
+        with self._lexical_lock:
+            self._lexical_state = "ready"
+        # Drop any results cached before hybrid search was available
+        self.result_cache.invalidate()
+        print(f"✅ Lexical index ready: {len(self.lexical_index)} documents in {time.time() - start:.1f}s")
+
+    def _lexical_ready(self) -> bool:
+        """True once the BM25 index is usable; starts a background build the first time"""
+        if self._lexical_state == "empty" and self._claim_lexical_build():
+            threading.Thread(target=self._load_lexical_index, name="kb-bm25", daemon=True).start()
+        return self._lexical_state == "ready"
+
+    @staticmethod
+    def _ingest_stats(added: int, skipped: int, errors: int, start: float) -> Dict:
+        elapsed = time.time() - start
+        stats = {
+            "added": added,
+            "skipped": skipped,
+            "errors": errors,
+            "seconds": elapsed,
+            "per_second": added / elapsed if elapsed > 0 else 0.0
+        }
+        print(f"✅ Bulk add finished: {added} added, {skipped} unchanged, {errors} errors "
+              f"in {elapsed:.1f}s ({stats['per_second']:.1f} complaints/s)")
+        return stats
+
+    def add_complaints_bulk(self, complaints: List[Dict], encode_batch_size: int = 64,
+                            write_batch_size: int = 1000) -> Dict:
+        """
+        Add (or update) many resolved complaints at once.
+        Each item is a dict with the add_complaint() keyword arguments.
+        Unchanged complaints are skipped, the rest are encoded in mini-batches
+        of encode_batch_size and upserted to ChromaDB in chunks of write_batch_size.
+        Returns {"added", "skipped", "errors", "seconds", "per_second"}.
+        """
+        start = time.time()
+        added = 0
+        skipped = 0
+        errors = 0
+
+        for chunk_start in range(0, len(complaints), write_batch_size):
+            chunk = complaints[chunk_start:chunk_start + write_batch_size]
+
+            try:
+                ids, documents, metadatas, unchanged = self._prepare_batch(chunk)
+                skipped += unchanged
+                if not ids:
+                    continue
+
+                self.collection.upsert(
+                    documents=documents,
+                    embeddings=self._encode_documents(documents, encode_batch_size),
+                    metadatas=metadatas,
+                    ids=ids
+                )
+                self._after_write(ids, documents, metadatas)
+                added += len(ids)
+            except Exception as e:
+                errors += len(chunk)
+                print(f"❌ Error adding batch of {len(chunk)} complaints: {e}")
+                continue
+
+            elapsed = time.time() - start
+            print(f"   ✓ Indexed {added} new/changed, {skipped} unchanged of {len(complaints)} "
+                  f"({added / elapsed:.1f}/s)")
+
+        return self._ingest_stats(added, skipped, errors, start)
+
+    def add_complaints_streaming(self, batches: Iterable[List[Dict]], encode_batch_size: int = 64,
+                                 queue_size: int = 2) -> Dict:
+        """
+        Pipelined version of add_complaints_bulk() for large sources.
+        Reading the next batch (in the calling thread), encoding the current
+        one and writing the previous one to ChromaDB run as three stages
+        connected by bounded queues, so memory stays at ~queue_size batches.
+        Returns the same stats dict as add_complaints_bulk().
+        """
+        start = time.time()
+        stats = {"added": 0, "skipped": 0, "errors": 0}
+        encode_queue = queue.Queue(maxsize=queue_size)
+        write_queue = queue.Queue(maxsize=queue_size)
+        done = object()
+
+        def encode_stage():
+            while True:
+                item = encode_queue.get()
+                if item is done:
+                    write_queue.put(done)
+                    return
+                ids, documents, metadatas = item
+                try:
+                    embeddings = self._encode_documents(documents, encode_batch_size)
+                    write_queue.put((ids, documents, embeddings, metadatas))
+                except Exception as e:
+                    stats["errors"] += len(ids)
+                    print(f"❌ Error encoding batch of {len(ids)} complaints: {e}")
+
+        def write_stage():
+            while True:
+                item = write_queue.get()
+                if item is done:
+                    return
+                ids, documents, embeddings, metadatas = item
+                try:
+                    self.collection.upsert(
+                        documents=documents,
+                        embeddings=embeddings,
+                        metadatas=metadatas,
+                        ids=ids
+                    )
+                    self._after_write(ids, documents, metadatas)
+                    stats["added"] += len(ids)
+                    elapsed = time.time() - start
+                    print(f"   ✓ Indexed {stats['added']} new/changed, {stats['skipped']} unchanged "
+                          f"({stats['added'] / elapsed:.1f}/s)")
+                except Exception as e:
+                    stats["errors"] += len(ids)
+                    print(f"❌ Error writing batch of {len(ids)} complaints: {e}")
+
+        workers = [
+            threading.Thread(target=encode_stage, name="kb-encode", daemon=True),
+            threading.Thread(target=write_stage, name="kb-write", daemon=True)
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            for batch in batches:
+                try:
+                    ids, documents, metadatas, unchanged = self._prepare_batch(batch)
+                except Exception as e:
+                    stats["errors"] += len(batch)
+                    print(f"❌ Error preparing batch of {len(batch)} complaints: {e}")
+                    continue
+                stats["skipped"] += unchanged
+                if ids:
+                    encode_queue.put((ids, documents, metadatas))
+        finally:
+            encode_queue.put(done)
+            for worker in workers:
+                worker.join()
+
+        return self._ingest_stats(stats["added"], stats["skipped"], stats["errors"], start)
+
+    def remove_complaints(self, complaint_ids: List) -> Optional[int]:
+        """Remove complaints (e.g. reopened ones) from the knowledge base; None if the delete failed"""
+        if not complaint_ids:
+            return 0
+        try:
+            doc_ids = [self._doc_id(cid) for cid in complaint_ids]
+            self.collection.delete(ids=doc_ids)
+            self._after_delete(doc_ids)
+            print(f"🗑️ Removed {len(complaint_ids)} complaint(s) from knowledge base")
+            return len(complaint_ids)
         except Exception as e:
-            print(f"❌ Search error: {e}")
-            return []
+            print(f"❌ Error removing complaints: {e}")
+            return None
+
+    def compact_duplicates(self, page_size: int = 1000) -> Dict:
+        """
+        Collapse duplicate entries left by the old random-id scheme into one
+        entry per complaint stored under its deterministic id.
+        Returns {"complaints", "removed"}.
+        """
+        # Scan first, then mutate, so deletes don't shift the pagination
+        groups = {}
+        offset = 0
+        while True:
+            page = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            for doc_id, metadata in zip(page["ids"], page["metadatas"]):
+                complaint_id = (metadata or {}).get("complaint_id")
+                groups.setdefault(str(complaint_id), []).append(doc_id)
+            offset += page_size
+
+        removed = 0
+        for complaint_id, ids in groups.items():
+            canonical = self._doc_id(complaint_id)
+            if ids == [canonical]:
+                continue
+
+            try:
+                # Keep the canonical entry if present, otherwise the first copy
+                keep_id = canonical if canonical in ids else ids[0]
+                kept = self.collection.get(ids=[keep_id],
+                                           include=["embeddings", "documents", "metadatas"])
+                document = kept["documents"][0]
+                metadata = dict(kept["metadatas"][0] or {})
+                metadata["content_hash"] = self._content_hash(
+                    document, metadata.get("status", "resolved"))
+
+                self.collection.upsert(
+                    ids=[canonical],
+                    documents=[document],
+                    embeddings=[list(kept["embeddings"][0])],
+                    metadatas=[metadata]
+                )
+                stale = [doc_id for doc_id in ids if doc_id != canonical]
+                self.collection.delete(ids=stale)
+                self._after_write([canonical], [document], [metadata])
+                self._after_delete(stale)
+                removed += len(stale) - (0 if canonical in ids else 1)
+            except Exception as e:
+                print(f"❌ Error compacting complaint {complaint_id}: {e}")
+
+        print(f"✅ Compaction done: {len(groups)} complaints, {removed} duplicates removed")
+        return {"complaints": len(groups), "removed": removed}
     
+    def search_similar_complaints(self, query: str, complaint_type: str = None, top_k: int = 3) -> List[Dict]:
+        """Search for similar past complaints using semantic search"""
+        return self.search_similar_complaints_batch([query], complaint_type, top_k)[0]
+
+    @staticmethod
+    def _format_results(metadatas: List[Dict], distances: List[float]) -> List[Dict]:
+        similar_complaints = []
+        for metadata, distance in zip(metadatas, distances):
+            similar_complaints.append({
+                "complaint_id": metadata.get("complaint_id"),
+                "title": metadata.get("title"),
+                "description": metadata.get("description"),
+                "type": metadata.get("complaint_type"),
+                "solution": metadata.get("solution"),
+                # Calculate similarity score (1 - distance)
+                "similarity_score": 1 - distance
+            })
+        return similar_complaints
+
+    def search_similar_complaints_batch(self, queries: List[str], complaint_types=None,
+                                        top_k: int = 3, hybrid: bool = None) -> List[List[Dict]]:
+        """
+        Search for several queries at once: one encode call for all of them and
+        one Chroma query per distinct type filter (Chroma applies a single
+        `where` to a multi-embedding query).
+        complaint_types is None, one type for every query, or a list per query.
+        With hybrid search, BM25 hits are fused with the vector hits by
+        reciprocal rank; if the lexical index isn't built yet or BM25 scoring
+        for a query exceeds LEXICAL_BUDGET_MS, vector-only results are returned.
+        Those are cached too, except while the index is still building.
+        Returns one result list per query, in order.
+        """
+        if complaint_types is None or isinstance(complaint_types, str):
+            complaint_types = [complaint_types] * len(queries)
+        if len(complaint_types) != len(queries):
+            raise ValueError("complaint_types must match queries")
+        hybrid = self.hybrid_search if hybrid is None else hybrid
+
+        # Repeated lookups are served from the result cache until the next write
+        generation = self.result_cache.generation
+        cache_keys = [(EmbeddingCache.key(q), t, top_k, hybrid) for q, t in zip(queries, complaint_types)]
+        results = [self.result_cache.get(key) for key in cache_keys]
+        missing = [i for i, cached in enumerate(results) if cached is None]
+        if len(missing) < len(queries):
+            print(f"⚡ Cached result for {len(queries) - len(missing)} of {len(queries)} queries")
+        if not missing:
+            return results
+
+        # Generate query embeddings in one batch (cached by normalized text)
+        embeddings = self._encode_documents([queries[i] for i in missing])
+        by_type = {}
+        for i, embedding in zip(missing, embeddings):
+            by_type.setdefault(complaint_types[i], []).append((i, embedding))
+
+        use_lexical = hybrid and self._lexical_ready()
+        depth = max(top_k * 4, 20) if use_lexical else top_k
+
+        for complaint_type, group in by_type.items():
+            # Build where filter for complaint type
+            where_filter = {"complaint_type": complaint_type} if complaint_type else None
+            try:
+                response = self.collection.query(
+                    query_embeddings=[embedding for _, embedding in group],
+                    n_results=depth,
+                    where=where_filter
+                )
+            except Exception as e:
+                print(f"❌ Search error: {e}")
+                for i, _ in group:
+                    results[i] = []
+                continue
+
+            for row, (i, embedding) in enumerate(group):
+                vector_hits = list(zip(response["ids"][row],
+                                       (response["metadatas"] or [[]])[row],
+                                       (response["distances"] or [[]])[row]))
+                lexical_hits = None
+                if use_lexical:
+                    # Each query gets its own budget, so one slow query can't degrade the rest
+                    deadline = time.perf_counter() + LEXICAL_BUDGET_MS / 1000
+                    lexical_hits = self.lexical_index.search(queries[i], depth, complaint_type, deadline)
+                    if lexical_hits is None:
+                        print("⏱️ Lexical search over budget, using vector results only")
+
+                if lexical_hits is None:
+                    ids, metadatas, distances = zip(*vector_hits[:top_k]) if vector_hits else ((), (), ())
+                    results[i] = self._format_results(metadatas, distances)
+                    if hybrid and not use_lexical:
+                        continue   # index still building: hybrid results will replace this soon
+                else:
+                    results[i] = self._fuse(vector_hits, lexical_hits, embedding, top_k)
+                self.result_cache.put(cache_keys[i], results[i], generation)
+
+        print(f"🔍 Found {sum(len(r) for r in results)} similar complaints for {len(queries)} queries")
+        return results
+
+    def _fuse(self, vector_hits: List, lexical_hits: List, query_embedding: List[float],
+              top_k: int) -> List[Dict]:
+        """Reciprocal-rank fusion of (id, metadata, distance) vector hits and (id, score) BM25 hits"""
+        scores = {}
+        for rank, (doc_id, _, _) in enumerate(vector_hits):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1 / (RRF_K + rank + 1)
+        for rank, (doc_id, _) in enumerate(lexical_hits):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1 / (RRF_K + rank + 1)
+        best = sorted(scores, key=lambda doc_id: -scores[doc_id])[:top_k]
+
+        found = {doc_id: (metadata, distance) for doc_id, metadata, distance in vector_hits}
+        lexical_only = [doc_id for doc_id in best if doc_id not in found]
+        if lexical_only:
+            # Lexical-only hits still get a cosine similarity, so scores stay comparable
+            extra = self.collection.get(ids=lexical_only, include=["metadatas", "embeddings"])
+            query = np.asarray(query_embedding, dtype=np.float32)
+            for doc_id, metadata, embedding in zip(extra["ids"], extra["metadatas"], extra["embeddings"]):
+                vector = np.asarray(embedding, dtype=np.float32)
+                cosine = float(query @ vector / (np.linalg.norm(query) * np.linalg.norm(vector) or 1.0))
+                found[doc_id] = (metadata, 1 - cosine)
+
+        lexical_ids = {doc_id for doc_id, _ in lexical_hits}
+        vector_ids = {doc_id for doc_id, _, _ in vector_hits}
+        fused = []
+        for doc_id in best:
+            if doc_id not in found:
+                continue
+            metadata, distance = found[doc_id]
+            result = self._format_results([metadata or {}], [distance])[0]
+            result["rrf_score"] = scores[doc_id]
+            result["matched_by"] = ("both" if doc_id in lexical_ids and doc_id in vector_ids
+                                    else "lexical" if doc_id in lexical_ids else "vector")
+            fused.append(result)
+        return fused
+
+    def classify_complaint_type(self, text: str, labels: List[str] = None, top_k: int = 15,
+                                exclude_ids: List = None) -> Dict:
+        """
+        kNN vote over the labeled complaints already in the index.
+        Each neighbor votes for its complaint_type with its similarity;
+        confidence is the winner's share of the votes.
+        Returns {"type", "confidence", "neighbors", "votes"}.
+        """
+        exclude = {self._doc_id(cid) for cid in (exclude_ids or [])}
+        query_embedding = self._encode_documents([text])[0]
+        results = self.collection.query(
+            query_embeddings=[query_embedding],
+            n_results=top_k + len(exclude),
+            include=["metadatas", "distances"]
+        )
+
+        votes = {}
+        neighbors = 0
+        for doc_id, metadata, distance in zip(results["ids"][0], results["metadatas"][0],
+                                              results["distances"][0]):
+            label = (metadata or {}).get("complaint_type")
+            if doc_id in exclude or (labels and label not in labels):
+                continue
+            if neighbors == top_k:
+                break
+            votes[label] = votes.get(label, 0.0) + max(1 - distance, 0.0)
+            neighbors += 1
+
+        total = sum(votes.values())
+        if not total:
+            return {"type": None, "confidence": 0.0, "neighbors": neighbors, "votes": votes}
+
+        best = max(votes, key=votes.get)
+        return {"type": best, "confidence": votes[best] / total, "neighbors": neighbors, "votes": votes}
+
+    def close(self):
+        """Release the Chroma client and the embedding cache file, drop cached results and the lexical index"""
+        self.embedding_cache.close()
+        self.result_cache.invalidate()
+        self.lexical_index.clear()
+
+        client, self.client, self.collection = self.client, None, None
+        if client is not None:
+            # chromadb has no public close(): stop the client's system (sqlite, HNSW
+            # segments) and drop it from the shared-system cache so the next client
+            # for this path starts fresh
+            try:
+                client._system.stop()
+                from chromadb.api.client import SharedSystemClient
+                SharedSystemClient._identifier_to_system.pop(client._identifier, None)
+            except Exception as e:
+                print(f"⚠️ Error releasing Chroma client: {e}")
+
     def get_stats(self):
         """Get statistics about the knowledge base"""
         try:
             count = self.collection.count()
             return {
                 "total_complaints": count,
-                "collection_name": self.collection.name
+                "collection_name": self.collection.name,
+                "embedding_backend": self.embedding_backend,
+                "lexical_index": dict(self.lexical_index.stats(), state=self._lexical_state),
+                "embedding_cache": self.embedding_cache.stats(),
+                "result_cache": self.result_cache.stats()
             }
         except Exception as e:
             print(f"❌ Error getting stats: {e}")
@@ -114,6 +643,8 @@ class ComplaintKnowledgeBase:
                 name="complaint_solutions",
                 metadata={"hnsw:space": "cosine"}
             )
+            self.result_cache.invalidate()
+            self.lexical_index.clear()
             print("✅ Knowledge base cleared")
         except Exception as e:
             print(f"❌ Error clearing knowledge base: {e}")
\ No newline at end of file
@@ -0,0 +1,76 @@
+from typing import Dict
+import atexit
+import os
+import threading
+
+from rag.embedders import release_shared_embedders
+
+_instances: Dict[str, object] = {}   # realpath -> ComplaintKnowledgeBase
+_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+_shutdown_hooks = []
+
+
+def _key(persist_directory: str) -> str:
+    return os.path.realpath(persist_directory)
+
+
+def get_knowledge_base(persist_directory: str = "./chroma_db", **kwargs):
+    """
+    Return the process-wide ComplaintKnowledgeBase for a persist directory,
+    creating it on first use. Concurrent first calls wait for a single load;
+    different directories load independently but share the embedding model.
+    kwargs are only used when the instance is created.
+    """
+    key = _key(persist_directory)
+    instance = _instances.get(key)
+    if instance is not None:
+        return instance
+
+    with _registry_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+
+    with lock:
+        instance = _instances.get(key)
+        if instance is None:
+            # Imported here so the registry itself is cheap to import
+            from rag.knowledge_base import ComplaintKnowledgeBase
+            instance = ComplaintKnowledgeBase(persist_directory=persist_directory, **kwargs)
+            _instances[key] = instance
+    return instance
+
+
+def loaded_knowledge_bases():
+    """Persist directories with a loaded instance"""
+    return list(_instances)
+
+
+def add_shutdown_hook(hook):
+    """Register hook() called after shutdown_knowledge_bases(), e.g. to drop cached handles"""
+    if hook not in _shutdown_hooks:
+        _shutdown_hooks.append(hook)
+
+
+def shutdown_knowledge_bases():
+    """Close every registered knowledge base, release the shared models and run the shutdown hooks"""
+    with _registry_lock:
+        instances = list(_instances.items())
+        _instances.clear()
+
+    for key, instance in instances:
+        try:
+            instance.close()
+        except Exception as e:
+            print(f"⚠️ Error closing knowledge base {key}: {e}")
+
+    release_shared_embedders()
+    for hook in list(_shutdown_hooks):
+        try:
+            hook()
+        except Exception as e:
+            print(f"⚠️ Knowledge base shutdown hook error: {e}")
+    if instances:
+        print(f"✅ Closed {len(instances)} knowledge base(s)")
+
+
+atexit.register(shutdown_knowledge_bases)
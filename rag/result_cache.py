@@ -0,0 +1,62 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+import copy
+import threading
+import time
+
+
+class ResultCache:
+    """
+    TTL + LRU cache for search results.
+    Every key is tagged with a generation number; invalidate() bumps the
+    generation so entries computed before a write are never served again.
+    """
+
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get((self.generation, key))
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[(self.generation, key)]
+                self.misses += 1
+                return default
+            self._entries.move_to_end((self.generation, key))
+            self.hits += 1
+            # Callers may mutate what they get back
+            return copy.deepcopy(entry[1])
+
+    def put(self, key: Hashable, value: Any, generation: int):
+        """Store value computed at `generation`; dropped if a write happened since"""
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[(generation, key)] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(value))
+            self._entries.move_to_end((generation, key))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
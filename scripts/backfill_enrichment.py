@@ -0,0 +1,263 @@
+"""
+Backfill sentiment_score (and optionally rephrased descriptions) on
+historical complaints.
+
+Walks `complains` in compl_id order, enriches each batch (sentiment in one
+batched call to the configured backend, rephrasing with bounded LLM
+concurrency), writes it back with one UPDATE per batch and checkpoints the
+last compl_id before the first failed row, so an interrupted run resumes
+where it stopped and failed rows are retried on the next run.
+
+    python scripts/backfill_enrichment.py                      # sentiment only
+    python scripts/backfill_enrichment.py --rephrase-before 2025-01-01
+    python scripts/backfill_enrichment.py --reset --dry-run
+
+Rephrasing overwrites compl_description, so it is opt-in and limited to
+rows created before the given date. The original text is kept in
+complaint_description_originals, which also marks the row as rephrased so
+it is never rewritten twice (even after --reset).
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions.db import DB_HOST, DB_PORT, DB_DATABASE, get_db_engine, get_pool_stats
+from actions.sentiment import SENTIMENT_BACKEND, sentiment_scores
+from actions.rephrase import rephrase_description
+from sqlalchemy import text
+
+# --- BACKFILL CONFIG FROM ENV ---
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "200"))
+BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "8"))   # in-flight LLM calls (rephrase + sentiment)
+BACKFILL_STATE_FILE = os.getenv("BACKFILL_STATE_FILE", "./backfill_state.json")
+
+
+def load_checkpoint():
+    try:
+        with open(BACKFILL_STATE_FILE) as f:
+            return int(json.load(f)["compl_id"])
+    except FileNotFoundError:
+        return 0
+
+
+def save_checkpoint(compl_id):
+    os.makedirs(os.path.dirname(BACKFILL_STATE_FILE) or ".", exist_ok=True)
+    tmp_path = BACKFILL_STATE_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"compl_id": compl_id}, f)
+    os.replace(tmp_path, BACKFILL_STATE_FILE)
+
+
+def ensure_originals_table(conn):
+    """Original descriptions of rephrased rows; a row here is never rephrased again"""
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS complaint_description_originals (
+            compl_id INT PRIMARY KEY,
+            original_description TEXT NOT NULL,
+            rephrased_at DATETIME NOT NULL
+        )
+    """))
+    conn.commit()
+
+
+def fetch_batch(conn, after_id, rephrase_before):
+    """Next batch of rows missing sentiment (or due for rephrasing), keyset-paginated"""
+    params = {"after_id": after_id, "limit": BACKFILL_BATCH_SIZE}
+    needs_rephrase = "0"
+    original = "c.compl_description"
+    originals_join = ""
+    if rephrase_before:
+        needs_rephrase = "(c.created_at < :rephrase_before AND o.compl_id IS NULL)"
+        original = "COALESCE(o.original_description, c.compl_description)"
+        originals_join = "LEFT JOIN complaint_description_originals o ON o.compl_id = c.compl_id"
+        params["rephrase_before"] = rephrase_before
+
+    return conn.execute(text(f"""
+        SELECT c.compl_id, c.compl_description, c.sentiment_score,
+               {original} AS original_description,
+               {needs_rephrase} AS needs_rephrase
+        FROM complains c
+        {originals_join}
+        WHERE c.compl_id > :after_id
+          AND c.compl_description IS NOT NULL AND c.compl_description != ''
+          AND (c.sentiment_score IS NULL OR {needs_rephrase})
+        ORDER BY c.compl_id
+        LIMIT :limit
+    """), params).fetchall()
+
+
+async def enrich_batch(rows):
+    """Returns ({compl_id: sentiment}, {compl_id: rephrased})"""
+    scoring = [row for row in rows if row.sentiment_score is None]
+    rephrasing = [row for row in rows if row.needs_rephrase]
+
+    limit = asyncio.Semaphore(BACKFILL_CONCURRENCY)
+
+    async def rephrase(row):
+        async with limit:
+            return await rephrase_description(row.compl_description, fallback=False)
+
+    # Sentiment is scored on the original text, before it is rephrased
+    async def score_all():
+        texts = [row.original_description for row in scoring]
+        if SENTIMENT_BACKEND != "llm":
+            return await sentiment_scores(texts)   # one local batch call
+
+        # One LLM call per text: take a slot first, so the call's timeout
+        # doesn't start while it is still queued behind the rest of the batch
+        async def score(text):
+            async with limit:
+                return (await sentiment_scores([text]))[0]
+        return await asyncio.gather(*(score(t) for t in texts))
+
+    scores, rephrased = await asyncio.gather(
+        score_all(),
+        asyncio.gather(*(rephrase(row) for row in rephrasing)),
+    )
+    return (
+        {row.compl_id: s for row, s in zip(scoring, scores) if s is not None},
+        {row.compl_id: r for row, r in zip(rephrasing, rephrased) if r},
+    )
+
+
+def case_update(column, values, extra_set=""):
+    """One UPDATE ... SET column = CASE compl_id WHEN ... for a whole batch"""
+    params, whens = {}, []
+    for i, (compl_id, value) in enumerate(values.items()):
+        params[f"id{i}"] = compl_id
+        params[f"v{i}"] = value
+        whens.append(f"WHEN :id{i} THEN :v{i}")
+    ids = ", ".join(f":id{i}" for i in range(len(values)))
+    sql = text(f"""
+        UPDATE complains
+        SET {column} = CASE compl_id {' '.join(whens)} END{extra_set}
+        WHERE compl_id IN ({ids})
+    """)
+    return sql, params
+
+
+def row_failed(row, scores, rephrased):
+    return ((row.sentiment_score is None and row.compl_id not in scores)
+            or (row.needs_rephrase and row.compl_id not in rephrased))
+
+
+def last_contiguous_success(rows, scores, rephrased):
+    """compl_id up to which every row was fully enriched (None if the first row failed)"""
+    done = None
+    for row in rows:
+        if row_failed(row, scores, rephrased):
+            break
+        done = row.compl_id
+    return done
+
+
+def write_batch(conn, rows, scores, rephrased):
+    if scores:
+        # Analytics-only column: leave updated_at alone so the KB sync doesn't re-index
+        conn.execute(*case_update("sentiment_score", scores, ", updated_at = updated_at"))
+    if rephrased:
+        originals = {row.compl_id: row.compl_description for row in rows}
+        conn.execute(text("""
+            INSERT INTO complaint_description_originals (compl_id, original_description, rephrased_at)
+            VALUES (:compl_id, :original, NOW())
+        """), [{"compl_id": compl_id, "original": originals[compl_id]} for compl_id in rephrased])
+        # New text: bump updated_at so `populate_knowledge_base.py --incremental` picks it up
+        conn.execute(*case_update("compl_description", rephrased, ", updated_at = NOW()"))
+    conn.commit()
+
+
+async def backfill(rephrase_before=None, limit=None, dry_run=False):
+    engine = get_db_engine()
+    last_id = load_checkpoint()
+    processed = scored = rewritten = failed = 0
+    checkpoint_held = False   # a row failed: later successes aren't checkpointed, so it's retried
+    start = time.time()
+
+    print(f"▶️  Resuming after compl_id {last_id}" if last_id else "▶️  Starting from the first complaint")
+
+    if rephrase_before:
+        with engine.connect() as conn:
+            ensure_originals_table(conn)
+
+    while limit is None or processed < limit:
+        with engine.connect() as conn:
+            rows = fetch_batch(conn, last_id, rephrase_before)
+        if not rows:
+            break
+        if limit is not None:
+            rows = rows[:limit - processed]
+
+        scores, rephrased = await enrich_batch(rows)
+        done = last_contiguous_success(rows, scores, rephrased)
+
+        if not dry_run:
+            with engine.connect() as conn:
+                write_batch(conn, rows, scores, rephrased)
+            if not checkpoint_held and done is not None:
+                save_checkpoint(done)
+        checkpoint_held = checkpoint_held or done != rows[-1].compl_id
+
+        # Keep walking past failed rows in this run; the checkpoint brings them back next time
+        last_id = rows[-1].compl_id
+        processed += len(rows)
+        scored += len(scores)
+        rewritten += len(rephrased)
+        failed += sum(row_failed(row, scores, rephrased) for row in rows)
+        elapsed = time.time() - start
+        print(f"   ... {processed} rows (up to #{last_id}), {processed / elapsed:.1f} rows/s")
+
+    elapsed = time.time() - start
+    return {
+        "processed": processed,
+        "scored": scored,
+        "rephrased": rewritten,
+        "failed": failed,
+        "seconds": elapsed,
+        "per_second": processed / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill sentiment_score / rephrased descriptions")
+    parser.add_argument("--rephrase-before", metavar="DATE",
+                        help="also rephrase descriptions of complaints created before DATE (YYYY-MM-DD)")
+    parser.add_argument("--limit", type=int, help="stop after N rows")
+    parser.add_argument("--dry-run", action="store_true", help="enrich but don't write or checkpoint")
+    parser.add_argument("--reset", action="store_true", help="ignore the checkpoint and start over")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 70)
+    print("🧮 BACKFILLING COMPLAINT ENRICHMENT")
+    print("=" * 70)
+    print(f"Database: {DB_HOST}:{DB_PORT}/{DB_DATABASE}")
+    print(f"Sentiment backend: {SENTIMENT_BACKEND}")
+    print(f"Rephrase: {'before ' + args.rephrase_before if args.rephrase_before else 'off'}")
+    print(f"Batch size: {BACKFILL_BATCH_SIZE}, LLM concurrency: {BACKFILL_CONCURRENCY}")
+    print("=" * 70 + "\n")
+
+    if args.reset and os.path.exists(BACKFILL_STATE_FILE):
+        os.remove(BACKFILL_STATE_FILE)
+
+    stats = asyncio.run(backfill(args.rephrase_before, args.limit, args.dry_run))
+
+    print("\n" + "=" * 70)
+    print("📊 FINAL STATISTICS")
+    print("=" * 70)
+    print(f"Rows processed: {stats['processed']}")
+    print(f"Sentiment scores written: {stats['scored']}")
+    print(f"Descriptions rephrased: {stats['rephrased']}")
+    print(f"Rows failed (retried next run): {stats['failed']}")
+    print(f"Throughput: {stats['per_second']:.1f} rows/s ({stats['seconds']:.1f}s)")
+    print(f"DB pool: {get_pool_stats()}")
+    if args.dry_run:
+        print("Dry run: nothing was written")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Offline check: agreement of a local sentiment backend with the LLM scores.
+
+Scores a sample of complaints that already have a sentiment_score (written
+by the LLM backend) with SENTIMENT_BACKEND, or --backend, and reports
+correlation, mean absolute difference, sign agreement and throughput. Run
+it before switching the default away from 'llm': sentiment_score is only
+comparable across complaints if every row uses the same scale. Exits with
+status 1 unless the backend meets --min-r and --min-agreement.
+
+    python scripts/benchmark_sentiment.py --sample 500
+    SENTIMENT_BACKEND=transformers python scripts/benchmark_sentiment.py
+"""
+import sys
+import os
+import math
+import time
+import asyncio
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions.db import get_db_engine
+from sqlalchemy import text
+
+
+def load_sample(size):
+    query = text("""
+        SELECT compl_id, compl_description, sentiment_score
+        FROM complains
+        WHERE sentiment_score IS NOT NULL
+          AND compl_description IS NOT NULL AND compl_description != ''
+        ORDER BY compl_id DESC
+        LIMIT :size
+    """)
+    with get_db_engine().connect() as conn:
+        return conn.execute(query, {"size": size}).fetchall()
+
+
+def pearson(xs, ys):
+    n = len(xs)
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    var_y = sum((y - mean_y) ** 2 for y in ys)
+    return cov / math.sqrt(var_x * var_y) if var_x and var_y else 0.0
+
+
+def polarity(score, neutral):
+    return 0 if abs(score) <= neutral else (1 if score > 0 else -1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a sentiment backend with the stored LLM scores")
+    parser.add_argument("--sample", type=int, default=500, help="number of scored complaints")
+    parser.add_argument("--backend", help="backend to test (default: SENTIMENT_BACKEND)")
+    parser.add_argument("--neutral", type=float, default=0.1, help="|score| at or below this counts as neutral")
+    parser.add_argument("--min-r", type=float, default=0.8, help="Pearson r needed to pass")
+    parser.add_argument("--min-agreement", type=float, default=0.85, help="polarity agreement needed to pass")
+    args = parser.parse_args()
+
+    if args.backend:
+        os.environ["SENTIMENT_BACKEND"] = args.backend
+    # Imported after --backend is applied: the backend is read at import
+    from actions.sentiment import SENTIMENT_BACKEND, sentiment_scores
+
+    rows = load_sample(args.sample)
+    if not rows:
+        print("❌ No scored complaints found")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    scores = asyncio.run(sentiment_scores([row.compl_description for row in rows]))
+    elapsed = time.perf_counter() - start
+
+    pairs = [(float(row.sentiment_score), s) for row, s in zip(rows, scores) if s is not None]
+    if not pairs:
+        print("❌ Backend returned no scores")
+        sys.exit(1)
+    reference, candidate = zip(*pairs)
+    n = len(pairs)
+
+    print("\n" + "=" * 70)
+    print(f"📊 SENTIMENT BACKEND AGREEMENT: {SENTIMENT_BACKEND} vs stored scores ({n} complaints)")
+    print("=" * 70)
+    print(f"Failed scores: {len(rows) - n}")
+    r = pearson(reference, candidate)
+    print(f"Pearson r: {r:.3f}")
+    print(f"Mean absolute difference: {sum(abs(r - c) for r, c in pairs) / n:.3f}")
+    print(f"Mean score: stored {sum(reference) / n:+.3f}, {SENTIMENT_BACKEND} {sum(candidate) / n:+.3f}")
+    agreement = sum(polarity(x, args.neutral) == polarity(c, args.neutral) for x, c in pairs) / n
+    print(f"Polarity agreement (neutral band ±{args.neutral}): {agreement:.1%}")
+    print(f"Throughput: {len(rows) / elapsed:.1f} texts/s ({elapsed:.1f}s)")
+    print("=" * 70)
+
+    if r >= args.min_r and agreement >= args.min_agreement:
+        print(f"✅ {SENTIMENT_BACKEND} matches the stored scale (r ≥ {args.min_r}, agreement ≥ {args.min_agreement:.0%})")
+    else:
+        print(f"❌ {SENTIMENT_BACKEND} doesn't match the stored scale (needs r ≥ {args.min_r}, "
+              f"agreement ≥ {args.min_agreement:.0%}); keep SENTIMENT_BACKEND=llm")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
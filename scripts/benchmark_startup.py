@@ -0,0 +1,97 @@
+"""
+Measure action-server cold start: how long `import actions` takes, which
+modules dominate it, and (optionally) how long the KB takes to become ready.
+
+Each measurement runs in a fresh interpreter so nothing is already cached.
+
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --with-kb --runs 3
+"""
+import sys
+import os
+import re
+import subprocess
+import argparse
+import statistics
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import actions.actions
+print(f"IMPORT_SECONDS={time.perf_counter() - start:.4f}")
+"""
+
+KB_SNIPPET = """
+import time
+start = time.perf_counter()
+import actions.actions
+from actions.kb import get_kb, kb_status
+imported = time.perf_counter()
+get_kb()
+print(f"IMPORT_SECONDS={imported - start:.4f}")
+print(f"KB_SECONDS={time.perf_counter() - imported:.4f}")
+print(f"KB_STATE={kb_status()['state']}")
+"""
+
+
+def run(snippet, importtime=False):
+    env = dict(os.environ, KB_WARMUP="false", BACKGROUND_JOBS="false")
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", snippet]
+    proc = subprocess.run(cmd, cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:])
+        sys.exit(f"❌ Import failed (exit {proc.returncode})")
+    values = dict(re.findall(r"^(\w+)=(.+)$", proc.stdout, re.MULTILINE))
+    return values, proc.stderr
+
+
+def slowest_imports(importtime_log, top):
+    """Top-level packages by cumulative import time (microseconds) from -X importtime"""
+    totals = {}
+    for line in importtime_log.splitlines():
+        m = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)", line)
+        if m and len(m.group(2)) <= 1:   # only direct imports, not their children
+            package = m.group(3).split(".")[0]
+            totals[package] = totals.get(package, 0) + int(m.group(1))
+    return sorted(totals.items(), key=lambda item: -item[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark action-server import / KB warm-up time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest top-level imports to list")
+    parser.add_argument("--with-kb", action="store_true", help="also time loading the knowledge base")
+    args = parser.parse_args()
+
+    import_seconds = [float(run(IMPORT_SNIPPET)[0]["IMPORT_SECONDS"]) for _ in range(args.runs)]
+    _, log = run(IMPORT_SNIPPET, importtime=True)
+
+    print("\n" + "=" * 70)
+    print("🚀 ACTION SERVER STARTUP BENCHMARK")
+    print("=" * 70)
+    print(f"import actions.actions: median {statistics.median(import_seconds):.2f}s, "
+          f"min {min(import_seconds):.2f}s, max {max(import_seconds):.2f}s ({args.runs} runs)")
+    print("-" * 70)
+    print("Slowest top-level imports (cumulative):")
+    for package, micros in slowest_imports(log, args.top):
+        print(f"   {package:<30} {micros / 1000:>8.1f} ms")
+
+    if args.with_kb:
+        kb_seconds = []
+        for _ in range(args.runs):
+            values, _ = run(KB_SNIPPET)
+            if values.get("KB_STATE") != "ready":
+                print(f"⚠️ KB did not load ({values.get('KB_STATE')})")
+                break
+            kb_seconds.append(float(values["KB_SECONDS"]))
+        if kb_seconds:
+            print("-" * 70)
+            print(f"KB ready after import: median {statistics.median(kb_seconds):.2f}s "
+                  f"(runs in the background when KB_WARMUP=true)")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
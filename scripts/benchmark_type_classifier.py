@@ -0,0 +1,124 @@
+"""
+Offline benchmark: local kNN complaint-type classifier vs the LLM.
+
+Classifies a sample of labeled complaints (leave-one-out, so a complaint
+never votes for itself) and reports accuracy, agreement with the LLM,
+coverage at each confidence threshold and per-call latency.
+
+    python scripts/benchmark_type_classifier.py --sample 200
+    python scripts/benchmark_type_classifier.py --no-llm
+"""
+import sys
+import os
+import time
+import asyncio
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.registry import get_knowledge_base
+from actions.db import get_db_engine
+from actions.classify import (COMPLAINT_TYPES, CLASSIFIER_MIN_CONFIDENCE, CLASSIFIER_MIN_NEIGHBORS,
+                              llm_complaint_type, local_complaint_type)
+from sqlalchemy import text, bindparam
+
+
+def load_sample(size):
+    query = text("""
+        SELECT compl_id, compl_title, compl_description, compl_type
+        FROM complains
+        WHERE compl_type IN :types
+          AND compl_description IS NOT NULL AND compl_description != ''
+        ORDER BY compl_id DESC
+        LIMIT :size
+    """).bindparams(bindparam("types", expanding=True))
+    with get_db_engine().connect() as conn:
+        return conn.execute(query, {"types": COMPLAINT_TYPES, "size": size}).fetchall()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def run_llm(texts):
+    async def one(t):
+        start = time.perf_counter()
+        try:
+            label = await llm_complaint_type(t)
+        except Exception as e:
+            print(f"⚠️ LLM error: {e}")
+            label = None
+        return label, time.perf_counter() - start
+
+    return await asyncio.gather(*(one(t) for t in texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local complaint-type classifier")
+    parser.add_argument("--sample", type=int, default=200, help="number of labeled complaints")
+    parser.add_argument("--no-llm", action="store_true", help="skip the LLM comparison")
+    args = parser.parse_args()
+
+    rows = load_sample(args.sample)
+    if not rows:
+        print("❌ No labeled complaints found")
+        return
+    texts = [f"{r.compl_title or ''}. {r.compl_description}" for r in rows]
+    labels = [r.compl_type for r in rows]
+
+    kb = get_knowledge_base("./chroma_db")
+    kb.classify_complaint_type(texts[0])   # warm up the model
+
+    local, local_seconds = [], []
+    for row, t in zip(rows, texts):
+        start = time.perf_counter()
+        _, result = local_complaint_type(kb, t, exclude_ids=[row.compl_id])
+        local_seconds.append(time.perf_counter() - start)
+        local.append(result)
+
+    llm, llm_seconds = [], []
+    if not args.no_llm:
+        for label, seconds in asyncio.run(run_llm(texts)):
+            llm.append(label)
+            llm_seconds.append(seconds)
+
+    n = len(rows)
+    print("\n" + "=" * 70)
+    print(f"📊 COMPLAINT TYPE CLASSIFIER BENCHMARK ({n} complaints)")
+    print("=" * 70)
+
+    local_acc = sum(r["type"] == l for r, l in zip(local, labels)) / n
+    print(f"Local kNN accuracy (always answer): {local_acc:.1%}")
+    print(f"Local latency: p50 {percentile(local_seconds, 50) * 1000:.1f} ms, "
+          f"p95 {percentile(local_seconds, 95) * 1000:.1f} ms")
+    if llm:
+        llm_acc = sum(p == l for p, l in zip(llm, labels)) / n
+        agreement = sum(r["type"] == p for r, p in zip(local, llm)) / n
+        print(f"LLM accuracy: {llm_acc:.1%}")
+        print(f"Local/LLM agreement: {agreement:.1%}")
+        print(f"LLM latency: p50 {percentile(llm_seconds, 50) * 1000:.0f} ms, "
+              f"p95 {percentile(llm_seconds, 95) * 1000:.0f} ms")
+
+    print("-" * 70)
+    print(f"{'threshold':>9}  {'coverage':>8}  {'local acc':>9}  {'hybrid acc':>10}")
+    for threshold in (0.4, 0.5, 0.6, 0.7, 0.8, 0.9):
+        confident = [r["neighbors"] >= CLASSIFIER_MIN_NEIGHBORS and r["confidence"] >= threshold
+                     for r in local]
+        covered = sum(confident)
+        correct = sum(c and r["type"] == l for c, r, l in zip(confident, local, labels))
+        hybrid = "-"
+        if llm:
+            hybrid_correct = sum((r["type"] if c else p) == l
+                                 for c, r, p, l in zip(confident, local, llm, labels))
+            hybrid = f"{hybrid_correct / n:.1%}"
+        marker = "  <- CLASSIFIER_MIN_CONFIDENCE" if threshold == CLASSIFIER_MIN_CONFIDENCE else ""
+        print(f"{threshold:>9.1f}  {covered / n:>8.1%}  "
+              f"{(correct / covered if covered else 0):>9.1%}  {hybrid:>10}{marker}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Recall-parity check for an alternative embedding backend.
+
+Encodes a sample of indexed complaints with the reference backend (torch)
+and a candidate (onnx / onnx-int8), then queries the existing Chroma index
+with both sets of vectors and compares the top-k neighbors. The candidate
+is safe to switch on when recall@k stays above the threshold, since the
+index itself was built with the reference model.
+
+    python scripts/check_embedding_parity.py --candidate onnx-int8 --sample 300
+"""
+import sys
+import os
+import time
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chromadb
+from rag.embedders import load_embedder
+
+
+def rss_mb():
+    """Current resident set size (Linux), for a rough memory comparison"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def timed_encode(model, texts, batch_size):
+    model.encode(texts[:batch_size], batch_size=batch_size)   # warm up
+    start = time.perf_counter()
+    vectors = np.asarray(model.encode(texts, batch_size=batch_size))
+    return vectors, (time.perf_counter() - start) / len(texts)
+
+
+def top_k_ids(collection, vectors, k):
+    results = collection.query(query_embeddings=vectors.tolist(), n_results=k, include=[])
+    return results["ids"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare an embedding backend against the reference model")
+    parser.add_argument("--candidate", default="onnx-int8", help="onnx or onnx-int8")
+    parser.add_argument("--reference", default="torch")
+    parser.add_argument("--sample", type=int, default=200, help="number of indexed complaints used as queries")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--min-recall", type=float, default=0.95)
+    parser.add_argument("--persist-directory", default="./chroma_db")
+    args = parser.parse_args()
+
+    collection = chromadb.PersistentClient(path=args.persist_directory).get_collection("complaint_solutions")
+    page = collection.get(include=["metadatas"], limit=args.sample)
+    queries = [f"{md.get('title', '')}. {md.get('description', '')}" for md in page["metadatas"]]
+    if not queries:
+        print("❌ Knowledge base is empty; run scripts/populate_knowledge_base.py first")
+        sys.exit(1)
+
+    k = min(args.top_k, collection.count())
+    report = {}
+    for backend in (args.reference, args.candidate):
+        rss_before = rss_mb()
+        load_start = time.perf_counter()
+        model = load_embedder(backend)
+        load_seconds = time.perf_counter() - load_start
+        vectors, per_text = timed_encode(model, queries, args.batch_size)
+        report[backend] = {
+            "vectors": vectors,
+            "neighbors": top_k_ids(collection, vectors, k),
+            "load_seconds": load_seconds,
+            "ms_per_text": per_text * 1000,
+            "rss_delta_mb": rss_mb() - rss_before,
+        }
+        del model
+
+    ref, cand = report[args.reference], report[args.candidate]
+    cosines = np.sum(ref["vectors"] * cand["vectors"], axis=1) / (
+        np.linalg.norm(ref["vectors"], axis=1) * np.linalg.norm(cand["vectors"], axis=1))
+    recalls = [len(set(r) & set(c)) / len(r) for r, c in zip(ref["neighbors"], cand["neighbors"]) if r]
+    top1 = np.mean([r[0] == c[0] for r, c in zip(ref["neighbors"], cand["neighbors"]) if r and c])
+    recall = float(np.mean(recalls))
+
+    print("\n" + "=" * 70)
+    print(f"📊 EMBEDDING PARITY: {args.candidate} vs {args.reference} ({len(queries)} queries, k={k})")
+    print("=" * 70)
+    print(f"Cosine(reference, candidate): mean {cosines.mean():.4f}, min {cosines.min():.4f}")
+    print(f"Recall@{k}: {recall:.1%}   Top-1 agreement: {top1:.1%}")
+    print("-" * 70)
+    print(f"{'backend':>10}  {'load s':>7}  {'ms/text':>8}  {'RSS +MB':>8}")
+    for backend in (args.reference, args.candidate):
+        r = report[backend]
+        print(f"{backend:>10}  {r['load_seconds']:>7.1f}  {r['ms_per_text']:>8.2f}  {r['rss_delta_mb']:>8.0f}")
+    print("=" * 70)
+    print("(RSS of the second backend is measured after the first was loaded; "
+          "run each backend in a fresh process for exact memory numbers)")
+
+    if recall < args.min_recall:
+        print(f"❌ Recall {recall:.1%} below {args.min_recall:.0%}: keep KB_EMBEDDING_BACKEND={args.reference}")
+        sys.exit(1)
+    print(f"✅ Parity OK: KB_EMBEDDING_BACKEND={args.candidate} can serve the existing index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import sys
+import os
+
+# Add parent directory to path so we can import from rag module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.registry import get_knowledge_base
+
+
+def compact_knowledge_base():
+    """
+    Remove duplicate complaints created by earlier population runs
+    (random ids) and move every complaint to its deterministic id
+    """
+
+    print("\n" + "="*70)
+    print("🧹 COMPACTING RAG KNOWLEDGE BASE")
+    print("="*70 + "\n")
+
+    kb = get_knowledge_base("./chroma_db")
+
+    before = kb.get_stats().get("total_complaints", 0)
+    print(f"📊 Entries before: {before}\n")
+
+    result = kb.compact_duplicates()
+
+    after = kb.get_stats().get("total_complaints", 0)
+    print("\n" + "="*70)
+    print("📊 FINAL STATISTICS")
+    print("="*70)
+    print(f"Unique complaints: {result['complaints']}")
+    print(f"Duplicates removed: {result['removed']}")
+    print(f"Entries after: {after}")
+    print("="*70 + "\n")
+
+
+if __name__ == "__main__":
+    compact_knowledge_base()
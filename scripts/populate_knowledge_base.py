@@ -1,25 +1,75 @@
 import sys
 import os
+import json
+import time
+import argparse
+from datetime import datetime
 
 # Add parent directory to path so we can import from rag module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from rag.knowledge_base import ComplaintKnowledgeBase
-from sqlalchemy import create_engine, text
+# This script's historical DB defaults, kept when it moved to the shared engine in actions.db
+os.environ.setdefault("DB_HOST", "127.0.0.1")
+os.environ.setdefault("DB_PASSWORD", "root")
 
+from rag.registry import get_knowledge_base
+from actions.db import DB_HOST, DB_PORT, DB_DATABASE, DB_USERNAME, get_db_engine, get_pool_stats
+from sqlalchemy import text
 
-# --- DB CONFIG FROM ENV ---
-DB_HOST = os.getenv("DB_HOST", "127.0.0.1")
-DB_PORT = os.getenv("DB_PORT", "3306")
-DB_DATABASE = os.getenv("DB_DATABASE", "bms_ged")
-DB_USERNAME = os.getenv("DB_USERNAME", "root")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "root")   # default you mentioned
+# --- BATCHING CONFIG FROM ENV ---
+ENCODE_BATCH_SIZE = int(os.getenv("KB_ENCODE_BATCH_SIZE", "64"))
+WRITE_BATCH_SIZE = int(os.getenv("KB_WRITE_BATCH_SIZE", "1000"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("KB_PIPELINE_QUEUE_SIZE", "2"))
 
+# --- INCREMENTAL SYNC CONFIG FROM ENV ---
+SYNC_STATE_FILE = os.getenv("KB_SYNC_STATE_FILE", "./chroma_db/sync_state.json")
+SYNC_BATCH_SIZE = int(os.getenv("KB_SYNC_BATCH_SIZE", "500"))
 
-def get_db_engine():
-    url = f"mysql+pymysql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_DATABASE}"
-    print(f"📡 Connecting to database: {DB_HOST}:{DB_PORT}/{DB_DATABASE} as {DB_USERNAME}")
-    return create_engine(url)
+
+def row_to_complaint(row):
+    """Map a complains row to add_complaint() keyword arguments"""
+    return {
+        "complaint_id": str(row.compl_id),
+        "title": row.compl_title or "No title",
+        "description": row.compl_description or "No description",
+        "complaint_type": row.compl_type or "Unknown",
+        "solution": row.compl_solution or "No solution",
+        "status": "resolved"
+    }
+
+
+def is_indexable(row):
+    """Same filter as the full load: resolved and with a real solution"""
+    return row.compl_job_status == 2 and row.compl_solution not in (None, "", "NULL")
+
+
+def load_sync_state():
+    """Return the stored (updated_at, compl_id) high-water mark, or None"""
+    try:
+        with open(SYNC_STATE_FILE) as f:
+            state = json.load(f)
+        return datetime.fromisoformat(state["updated_at"]), int(state["compl_id"])
+    except FileNotFoundError:
+        return None
+
+
+def save_sync_state(updated_at, compl_id):
+    os.makedirs(os.path.dirname(SYNC_STATE_FILE) or ".", exist_ok=True)
+    tmp_path = SYNC_STATE_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"updated_at": updated_at.isoformat(), "compl_id": compl_id}, f)
+    os.replace(tmp_path, SYNC_STATE_FILE)
+
+
+def current_high_water_mark(conn):
+    """Latest (updated_at, compl_id) in the complains table"""
+    return conn.execute(text("""
+        SELECT updated_at, compl_id
+        FROM complains
+        WHERE updated_at IS NOT NULL
+        ORDER BY updated_at DESC, compl_id DESC
+        LIMIT 1
+    """)).fetchone()
 
 
 def populate_from_database():
@@ -36,7 +86,7 @@ def populate_from_database():
     print("="*70 + "\n")
     
     # Initialize ChromaDB knowledge base
-    kb = ComplaintKnowledgeBase(persist_directory="./chroma_db")
+    kb = get_knowledge_base("./chroma_db")
     
     try:
         # Connect to YOUR database
@@ -44,7 +94,14 @@ def populate_from_database():
         engine = get_db_engine()
         
         # Query to get resolved complaints with solutions
-        query = text("""
+        resolved_filter = """
+            WHERE compl_job_status = 2
+              AND compl_solution IS NOT NULL 
+              AND compl_solution != ''
+              AND compl_solution != 'NULL'
+        """
+        count_query = text(f"SELECT COUNT(*) FROM complains {resolved_filter}")
+        query = text(f"""
             SELECT 
                 compl_id,
                 compl_title,
@@ -54,19 +111,17 @@ def populate_from_database():
                 compl_job_status,
                 updated_at
             FROM complains
-            WHERE compl_job_status = 2
-              AND compl_solution IS NOT NULL 
-              AND compl_solution != ''
-              AND compl_solution != 'NULL'
+            {resolved_filter}
             ORDER BY compl_id DESC
         """)
         
         print("🔍 Executing query...\n")
         
         with engine.connect() as conn:
-            results = conn.execute(query).fetchall()
+            # Taken before the load so later changes are picked up by --incremental
+            high_water_mark = current_high_water_mark(conn)
+            total_found = conn.execute(count_query).scalar()
         
-        total_found = len(results)
         print(f"✅ Found {total_found} resolved complaints with solutions\n")
         
         if total_found == 0:
@@ -84,36 +139,28 @@ def populate_from_database():
         print("📝 Adding complaints to ChromaDB vector database...")
         print("-"*70 + "\n")
         
-        # Add each complaint to RAG
-        count = 0
-        errors = 0
+        # Stream rows with a server-side cursor; fetching, encoding and
+        # writing to ChromaDB overlap inside add_complaints_streaming()
+        sample_results = []
         
-        for row in results:
-            try:
-                complaint_id = str(row.compl_id)
-                title = row.compl_title or "No title"
-                description = row.compl_description or "No description"
-                complaint_type = row.compl_type or "Unknown"
-                solution = row.compl_solution or "No solution"
-                
-                # Add to RAG
-                kb.add_complaint(
-                    complaint_id=complaint_id,
-                    title=title,
-                    description=description,
-                    complaint_type=complaint_type,
-                    solution=solution,
-                    status="resolved"
-                )
-                count += 1
-                
-                # Show progress every 10 complaints
-                if count % 10 == 0:
-                    print(f"   ✓ Processed {count}/{total_found} complaints...")
-                    
-            except Exception as e:
-                errors += 1
-                print(f"   ✗ Error with complaint {row.compl_id}: {e}")
+        def complaint_batches():
+            with engine.connect().execution_options(stream_results=True, yield_per=WRITE_BATCH_SIZE) as conn:
+                # Explicit size: Core results ignore the yield_per option and yield single rows
+                for batch in conn.execute(query).partitions(WRITE_BATCH_SIZE):
+                    if len(sample_results) < 3:
+                        sample_results.extend(batch[:3 - len(sample_results)])
+                    yield [row_to_complaint(row) for row in batch]
+        
+        bulk_stats = kb.add_complaints_streaming(
+            complaint_batches(),
+            encode_batch_size=ENCODE_BATCH_SIZE,
+            queue_size=PIPELINE_QUEUE_SIZE
+        )
+        count = bulk_stats["added"]
+        errors = bulk_stats["errors"]
+        
+        if high_water_mark and errors == 0:
+            save_sync_state(high_water_mark.updated_at, high_water_mark.compl_id)
         
         # Final statistics
         print("\n" + "="*70)
@@ -123,17 +170,19 @@ def populate_from_database():
         stats = kb.get_stats()
         print(f"Total complaints in database: {total_found}")
         print(f"Successfully added to RAG: {count}")
+        print(f"Unchanged (skipped): {bulk_stats['skipped']}")
+        print(f"Throughput: {bulk_stats['per_second']:.1f} complaints/s ({bulk_stats['seconds']:.1f}s)")
         if errors > 0:
             print(f"Errors encountered: {errors}")
         print(f"Knowledge base total: {stats.get('total_complaints', 0)}")
         print(f"Collection: {stats.get('collection_name', 'N/A')}")
+        print(f"DB pool: {get_pool_stats()}")
         print("="*70)
         
         # Show some examples
         if count > 0:
             print(f"\n📋 SAMPLE COMPLAINTS LOADED:")
             print("-"*70)
-            sample_results = results[:3]  # Show first 3
             for row in sample_results:
                 print(f"\n   ID: {row.compl_id}")
                 print(f"   Title: {row.compl_title}")
@@ -166,7 +215,98 @@ def populate_from_database():
         traceback.print_exc()
 
 
+def sync_incremental(kb=None):
+    """
+    Sync only complaints changed since the last run.
+    Streams rows with updated_at/compl_id past the stored high-water mark,
+    upserts newly resolved ones and removes ones that are no longer resolved.
+    """
+    state = load_sync_state()
+    if state is None:
+        print("⚠️  No sync state found, run a full population first")
+        return
+
+    since_updated_at, since_compl_id = state
+    print(f"🔄 Incremental sync since {since_updated_at} (compl_id {since_compl_id})")
+
+    kb = kb or get_knowledge_base("./chroma_db")
+    engine = get_db_engine()
+
+    query = text("""
+        SELECT
+            compl_id,
+            compl_title,
+            compl_description,
+            compl_type,
+            compl_solution,
+            compl_job_status,
+            updated_at
+        FROM complains
+        WHERE updated_at > :since_updated_at
+           OR (updated_at = :since_updated_at AND compl_id > :since_compl_id)
+        ORDER BY updated_at, compl_id
+    """)
+
+    start = time.time()
+    upserted = removed = seen = 0
+
+    # Server-side cursor: rows are fetched in batches, not all at once
+    with engine.connect().execution_options(stream_results=True, yield_per=SYNC_BATCH_SIZE) as conn:
+        result = conn.execute(query, {
+            "since_updated_at": since_updated_at,
+            "since_compl_id": since_compl_id
+        })
+
+        # Explicit size: Core results ignore the yield_per option and yield single rows
+        for batch in result.partitions(SYNC_BATCH_SIZE):
+            to_upsert = [row_to_complaint(row) for row in batch if is_indexable(row)]
+            to_remove = [str(row.compl_id) for row in batch if not is_indexable(row)]
+
+            if to_upsert:
+                stats = kb.add_complaints_bulk(
+                    to_upsert,
+                    encode_batch_size=ENCODE_BATCH_SIZE,
+                    write_batch_size=WRITE_BATCH_SIZE
+                )
+                if stats["errors"]:
+                    print("❌ Sync stopped, high-water mark not advanced past failed batch")
+                    break
+                upserted += stats["added"]
+            count = kb.remove_complaints(to_remove)
+            if count is None:
+                print("❌ Sync stopped, high-water mark not advanced past failed removal")
+                break
+            removed += count
+
+            seen += len(batch)
+            last = batch[-1]
+            save_sync_state(last.updated_at, last.compl_id)
+
+    elapsed = time.time() - start
+    print(f"✅ Incremental sync: {seen} changed rows, {upserted} upserted, "
+          f"{removed} removed in {elapsed:.1f}s")
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Populate the RAG knowledge base from the complains table")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only sync complaints changed since the last run")
+    parser.add_argument("--interval", type=int, default=0,
+                        help="with --incremental, repeat the sync every N seconds")
+    args = parser.parse_args()
+
+    if args.incremental:
+        kb = get_knowledge_base("./chroma_db")
+        while True:
+            try:
+                sync_incremental(kb)
+            except Exception as e:
+                print(f"❌ Incremental sync failed: {e}")
+            if args.interval <= 0:
+                break
+            time.sleep(args.interval)
+        sys.exit(0)
+
     print("\n")
     print("╔════════════════════════════════════════════════════════════════════╗")
     print("║          RAG KNOWLEDGE BASE POPULATION SCRIPT                      ║")
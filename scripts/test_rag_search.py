@@ -2,7 +2,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from rag.knowledge_base import ComplaintKnowledgeBase
+from rag.registry import get_knowledge_base
 
 def test_specific_query():
     """Test RAG with specific power sag complaint"""
@@ -19,7 +19,7 @@ def test_specific_query():
     print("-"*70)
     
     # Initialize KB
-    kb = ComplaintKnowledgeBase(persist_directory="./chroma_db")
+    kb = get_knowledge_base("./chroma_db")
     
     # Check if KB has data
     stats = kb.get_stats()
@@ -32,17 +32,18 @@ def test_specific_query():
         print("   Run: python scripts/populate_knowledge_base.py")
         return
     
+    # Tests 1 and 2 share one batched encode + index pass
+    results_all, results_filtered = kb.search_similar_complaints_batch(
+        queries=[query, query],
+        complaint_types=[None, complaint_type],
+        top_k=5
+    )
+    
     # Test 1: Search WITHOUT type filter
     print(f"\n{'='*70}")
     print("🔍 TEST 1: Search WITHOUT type filter (all types)")
     print("-"*70)
     
-    results_all = kb.search_similar_complaints(
-        query=query,
-        complaint_type=None,
-        top_k=5
-    )
-    
     if results_all:
         print(f"✅ Found {len(results_all)} similar complaints (any type):\n")
         for i, result in enumerate(results_all, 1):
@@ -61,12 +62,6 @@ def test_specific_query():
     print(f"🔍 TEST 2: Search WITH type filter = '{complaint_type}'")
     print("-"*70)
     
-    results_filtered = kb.search_similar_complaints(
-        query=query,
-        complaint_type=complaint_type,
-        top_k=5
-    )
-    
     if results_filtered:
         print(f"✅ Found {len(results_filtered)} similar complaints (filtered by type):\n")
         for i, result in enumerate(results_filtered, 1):
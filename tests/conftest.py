@@ -0,0 +1,53 @@
+import os
+import sys
+
+# Tests import the actions / rag packages from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hashlib
+import re
+
+import numpy as np
+import pytest
+
+
+class FakeEmbedder:
+    """Deterministic bag-of-words vectors: no model download, texts sharing words are close"""
+
+    dimensions = 64
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, sentences, batch_size=32, show_progress_bar=False):
+        self.calls += 1
+        vectors = np.zeros((len(sentences), self.dimensions), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            for word in re.findall(r"\w+", sentence.lower()):
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dimensions] += 1.0
+            vectors[row] /= np.linalg.norm(vectors[row]) or 1.0
+        return vectors
+
+
+@pytest.fixture
+def embedder():
+    return FakeEmbedder()
+
+
+@pytest.fixture
+def make_kb(tmp_path, monkeypatch, embedder):
+    """ComplaintKnowledgeBase on a real (temporary) Chroma index with the fake embedder"""
+    pytest.importorskip("chromadb")
+    from rag import knowledge_base
+
+    monkeypatch.setattr(knowledge_base, "get_shared_embedder", lambda backend=None: embedder)
+    created = []
+
+    def make(**kwargs):
+        kb = knowledge_base.ComplaintKnowledgeBase(persist_directory=str(tmp_path / "chroma"), **kwargs)
+        created.append(kb)
+        return kb
+
+    yield make
+    for kb in created:
+        kb.close()
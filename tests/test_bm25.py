@@ -0,0 +1,81 @@
+from rag.bm25 import BM25Index
+
+
+def make_index():
+    index = BM25Index()
+    index.upsert_many([
+        ("a", "Breaker QO-120 trips in unit 4B", "Electricity failure"),
+        ("b", "Lights flicker in the hallway", "Electricity failure"),
+        ("c", "Water leak under the kitchen sink", "Plumbing failure"),
+        ("d", "Leak in the bathroom ceiling, water dripping", "Plumbing failure"),
+    ])
+    return index
+
+
+def test_tokenize_keeps_codes_whole_and_split():
+    assert BM25Index.tokenize("Breaker QO-120, unit b2/3") == \
+        ["breaker", "qo-120", "qo", "120", "unit", "b2/3", "b2", "3"]
+
+
+def test_exact_code_ranks_first():
+    assert make_index().search("qo-120 breaker")[0][0] == "a"
+    assert make_index().search("QO 120")[0][0] == "a"
+
+
+def test_more_matching_terms_rank_higher():
+    ids = [doc_id for doc_id, _ in make_index().search("water leak bathroom")]
+    assert ids[:2] == ["d", "c"]
+
+
+def test_type_filter_and_top_k():
+    index = make_index()
+    assert [doc_id for doc_id, _ in index.search("leak hallway", complaint_type="Electricity failure")] == ["b"]
+    assert len(index.search("leak water", top_k=1)) == 1
+
+
+def test_upsert_replaces_and_remove_forgets():
+    index = make_index()
+    index.upsert("c", "Door lock broken", "Technical failure")
+    assert "c" not in [doc_id for doc_id, _ in index.search("kitchen sink")]
+
+    index.remove(["a"])
+    assert index.search("qo-120") == []
+    assert len(index) == 3
+    assert index._total_length == sum(index._doc_length.values())
+
+
+def test_passed_deadline_returns_none():
+    assert make_index().search("leak", deadline=0.0) is None
+
+
+def test_empty_index_or_query():
+    assert BM25Index().search("leak") == []
+    assert make_index().search("!!!") == []
+
+
+def test_stopwords_and_common_terms_are_skipped():
+    index = make_index()
+    assert index.search("the in") == []
+
+    index.upsert_many((f"x{i}", f"tenant reports noise {i}", None) for i in range(30))
+    assert index.search("tenant") == []   # in most documents: near-zero IDF
+    assert index.search("tenant sink")[0][0] == "c"
+
+
+def test_deadline_is_checked_within_a_long_posting_list(monkeypatch):
+    import rag.bm25 as bm25
+
+    index = BM25Index(min_idf=0)
+    index.upsert_many((str(i), "leak", None) for i in range(bm25.DEADLINE_CHECK_EVERY * 2))
+    calls = []
+
+    def clock():
+        calls.append(None)
+        return 0.0 if len(calls) == 1 else 1.0   # expires after the per-term check
+
+    monkeypatch.setattr(bm25.time, "perf_counter", clock)
+    result = index.search("leak", deadline=0.5)
+    monkeypatch.undo()
+
+    assert result is None
+    assert len(calls) == 2
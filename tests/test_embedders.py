@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from rag.embedders import int8_model_file, load_embedder
+
+
+@pytest.mark.parametrize("machine, flags, expected", [
+    ("aarch64", set(), "onnx/model_qint8_arm64.onnx"),
+    ("arm64", {"avx512_vnni"}, "onnx/model_qint8_arm64.onnx"),
+    ("x86_64", {"avx2", "avx512bw", "avx512_vnni"}, "onnx/model_qint8_avx512_vnni.onnx"),
+    ("x86_64", {"avx2", "avx512f", "avx512bw"}, "onnx/model_qint8_avx512.onnx"),
+    ("x86_64", {"avx2"}, "onnx/model_quint8_avx2.onnx"),
+    ("x86_64", set(), "onnx/model_quint8_avx2.onnx"),
+])
+def test_int8_export_matches_host(machine, flags, expected):
+    assert int8_model_file(machine, flags) == expected
+
+
+CORPUS = [
+    "Water leaking from the ceiling in the bathroom",
+    "Kitchen sink drain is clogged and smells",
+    "Toilet keeps running after flushing",
+    "No hot water in apartment 12",
+    "Power outage in the whole building since this morning",
+    "Circuit breaker trips when the oven is on",
+    "Hallway lights on the third floor are out",
+    "Sparks coming from the living room outlet",
+    "Elevator B is stuck between floors",
+    "Heating does not work, radiators are cold",
+    "Air conditioning makes a loud noise",
+    "Front door lock is broken",
+    "Garbage was not collected this week",
+    "Stairwell has not been cleaned for days",
+    "Graffiti on the wall near the entrance",
+    "Broken glass in the parking garage",
+]
+QUERIES = [
+    "pipe leak under the sink",
+    "lights not working in the corridor",
+    "lift is blocked",
+    "radiator cold, no heat",
+    "trash bins overflowing",
+    "fuite d'eau dans la salle de bain",
+]
+
+
+def _load(backend):
+    pytest.importorskip("onnxruntime" if backend.startswith("onnx") else "sentence_transformers")
+    pytest.importorskip("tokenizers")
+    try:
+        return load_embedder(backend)
+    except Exception as e:   # model not cached and no network
+        pytest.skip(f"{backend} model unavailable: {e}")
+
+
+def _neighbors(model, k):
+    corpus = np.asarray(model.encode(CORPUS))
+    queries = np.asarray(model.encode(QUERIES))
+    return np.argsort(-(queries @ corpus.T), axis=1)[:, :k], queries
+
+
+@pytest.mark.parametrize("candidate, min_cosine", [("onnx", 0.999), ("onnx-int8", 0.95)])
+def test_onnx_backend_recall_parity(candidate, min_cosine):
+    reference = _load("torch")
+    model = _load(candidate)
+    k = 3
+
+    ref_neighbors, ref_vectors = _neighbors(reference, k)
+    cand_neighbors, cand_vectors = _neighbors(model, k)
+
+    cosines = np.sum(ref_vectors * cand_vectors, axis=1)   # both L2-normalized
+    recall = np.mean([len(set(r) & set(c)) / k for r, c in zip(ref_neighbors, cand_neighbors)])
+    assert cosines.min() >= min_cosine
+    assert recall >= 0.9
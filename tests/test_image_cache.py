@@ -0,0 +1,24 @@
+from actions.image_cache import ImageCache, key_from_url
+
+
+def test_key_from_virtual_host_url():
+    url = "https://rasabot.s3.us-west-004.backblazeb2.com/complaints/2026/10/a.webp"
+    assert key_from_url(url, "rasabot") == "complaints/2026/10/a.webp"
+
+
+def test_key_from_path_style_url():
+    url = "http://localhost:9000/rasabot/complaints/2026/10/a.webp"
+    assert key_from_url(url, "rasabot") == "complaints/2026/10/a.webp"
+    assert key_from_url(url) == "rasabot/complaints/2026/10/a.webp"
+
+
+def test_cache_evicts_least_recently_used_over_budget():
+    cache = ImageCache(max_bytes=10)
+    cache.put("a", b"12345", "image/webp")
+    cache.put("b", b"12345", "image/webp")
+    cache.get("a")
+    cache.put("c", b"12345", "image/webp")
+
+    assert cache.get("a") == b"12345"
+    assert cache.get("b") is None
+    assert cache.get("c") == b"12345"
@@ -0,0 +1,78 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from actions import jobs
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    """A fresh queue file; workers are not started, tests drive _claim/_process directly"""
+    monkeypatch.setattr(jobs, "JOB_QUEUE_PATH", str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(jobs, "start_workers", lambda: None)
+    monkeypatch.setattr(jobs, "_handlers", {})
+    monkeypatch.setattr(jobs, "_local", type(jobs._local)())
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+def test_jobs_survive_a_restart(queue):
+    job_id = jobs.enqueue("complaint_email", {"complaint_id": 7})
+
+    # A new connection (as after a restart) still sees the pending job
+    conn = sqlite3.connect(jobs.JOB_QUEUE_PATH)
+    assert conn.execute("SELECT status, payload FROM jobs WHERE id = ?", (job_id,)).fetchone() == \
+        ("pending", '{"complaint_id": 7}')
+    conn.close()
+
+
+def test_successful_job_is_done(queue):
+    seen = []
+
+    @jobs.job_handler("complaint_sentiment")
+    async def handler(payload):
+        seen.append(payload)
+
+    job_id = jobs.enqueue("complaint_sentiment", {"complaint_id": 1})
+    jobs._process(queue, jobs._claim())
+
+    assert seen == [{"complaint_id": 1}]
+    assert jobs.get_job(job_id)["status"] == "done"
+    assert jobs._claim() is None
+
+
+def test_failed_job_is_retried_with_backoff_then_given_up(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_RETRY_BASE_SECONDS", 5)
+
+    @jobs.job_handler("complaint_email")
+    def handler(payload):
+        raise RuntimeError("SMTP down")
+
+    job_id = jobs.enqueue("complaint_email", {}, max_attempts=2)
+
+    jobs._process(queue, jobs._claim())
+    job = jobs.get_job(job_id)
+    assert (job["status"], job["attempts"], job["last_error"]) == ("pending", 1, "SMTP down")
+    run_after = jobs._conn().execute("SELECT run_after FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+    assert 4 < run_after - time.time() <= 5
+    assert jobs._claim() is None   # not due yet
+
+    jobs._conn().execute("UPDATE jobs SET run_after = 0 WHERE id = ?", (job_id,))   # backoff elapsed
+    jobs._process(queue, jobs._claim())
+    job = jobs.get_job(job_id)
+    assert (job["status"], job["attempts"]) == ("failed", 2)
+    assert jobs.queue_stats() == {"failed": 1}
+
+
+def test_expired_lease_is_claimed_again(queue, monkeypatch):
+    job_id = jobs.enqueue("complaint_email", {})
+    assert jobs._claim()["id"] == job_id   # the worker then dies without finishing
+    assert jobs._claim() is None
+
+    monkeypatch.setattr(jobs, "JOB_LEASE_SECONDS", 0)
+    reclaimed = jobs._claim()
+    assert reclaimed["id"] == job_id
+    assert jobs.get_job(job_id)["attempts"] == 2
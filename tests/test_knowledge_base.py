@@ -0,0 +1,147 @@
+COMPLAINTS = [
+    {"complaint_id": "1", "title": "Leaking pipe", "description": "Water leaking under the kitchen sink",
+     "complaint_type": "Plumbing failure", "solution": "Replaced the sink trap seal"},
+    {"complaint_id": "2", "title": "No power", "description": "Power outage in apartment 4",
+     "complaint_type": "Electricity failure", "solution": "Reset the main breaker"},
+    {"complaint_id": "3", "title": "Elevator stuck", "description": "Elevator B stuck on floor 3",
+     "complaint_type": "Technical failure", "solution": "Technician restarted elevator B"},
+]
+
+
+def test_unchanged_complaints_are_not_re_embedded(make_kb, embedder):
+    kb = make_kb(hybrid_search=False)
+    first = kb.add_complaints_bulk(COMPLAINTS)
+    calls = embedder.calls
+
+    second = kb.add_complaints_bulk(COMPLAINTS)
+
+    assert (first["added"], first["skipped"]) == (3, 0)
+    assert (second["added"], second["skipped"]) == (0, 3)
+    assert embedder.calls == calls
+    assert kb.collection.count() == 3
+
+
+def test_changed_complaint_is_upserted_in_place(make_kb):
+    kb = make_kb(hybrid_search=False)
+    kb.add_complaints_bulk(COMPLAINTS)
+
+    edited = dict(COMPLAINTS[0], solution="Replaced the whole pipe")
+    stats = kb.add_complaints_bulk([edited] + COMPLAINTS[1:])
+
+    assert (stats["added"], stats["skipped"]) == (1, 2)
+    assert kb.collection.count() == 3
+    stored = kb.collection.get(ids=[kb._doc_id("1")], include=["metadatas"])["metadatas"][0]
+    assert stored["solution"] == "Replaced the whole pipe"
+
+
+def test_status_change_counts_as_a_change(make_kb):
+    kb = make_kb(hybrid_search=False)
+    kb.add_complaints_bulk(COMPLAINTS)
+
+    stats = kb.add_complaints_bulk([dict(COMPLAINTS[0], status="reopened")])
+
+    assert stats["added"] == 1
+
+
+def test_search_is_cached_until_the_next_write(make_kb):
+    kb = make_kb(hybrid_search=False)
+    kb.add_complaints_bulk(COMPLAINTS)
+
+    first = kb.search_similar_complaints("kitchen sink leaking", top_k=2)
+    assert first[0]["complaint_id"] == "1"
+    assert kb.search_similar_complaints("kitchen sink leaking", top_k=2) == first
+    assert kb.result_cache.hits == 1
+
+    kb.remove_complaints(["1"])
+    assert all(r["complaint_id"] != "1" for r in kb.search_similar_complaints("kitchen sink leaking", top_k=2))
+
+
+HYBRID_COMPLAINTS = COMPLAINTS + [
+    {"complaint_id": str(i), "title": f"Power issue {i}", "description": f"Power outage in apartment {i}",
+     "complaint_type": "Electricity failure", "solution": "Reset the breaker"}
+    for i in range(4, 12)
+] + [
+    {"complaint_id": "12", "title": "Breaker QO-120", "description": "QO-120 keeps tripping",
+     "complaint_type": "Electricity failure", "solution": "Replaced the QO-120 breaker"},
+]
+
+
+def test_rrf_fuses_lexical_and_vector_hits(make_kb):
+    kb = make_kb(hybrid_search=True)
+    kb.add_complaints_bulk(HYBRID_COMPLAINTS)
+    kb.build_lexical_index()
+
+    results = kb.search_similar_complaints("qo-120 tripping", top_k=3)
+
+    assert results[0]["complaint_id"] == "12"
+    assert results[0]["matched_by"] == "both"
+    assert all(0 <= r["similarity_score"] <= 1 for r in results)
+    assert [r["rrf_score"] for r in results] == sorted((r["rrf_score"] for r in results), reverse=True)
+
+
+def test_vector_only_results_during_the_build_are_not_cached(make_kb):
+    kb = make_kb(hybrid_search=True)
+    kb.add_complaints_bulk(HYBRID_COMPLAINTS)
+    assert kb._claim_lexical_build()   # the background build is still running
+
+    during = kb.search_similar_complaints("qo-120 tripping", top_k=3)
+    assert all("matched_by" not in r for r in during)
+    assert kb.result_cache.stats()["size"] == 0
+
+    kb._load_lexical_index()   # build finishes
+    after = kb.search_similar_complaints("qo-120 tripping", top_k=3)
+    assert after[0]["matched_by"] == "both"
+
+
+def test_each_query_gets_its_own_lexical_budget(make_kb, monkeypatch):
+    import time
+    from rag import knowledge_base
+
+    kb = make_kb(hybrid_search=True)
+    kb.add_complaints_bulk(HYBRID_COMPLAINTS)
+    kb.build_lexical_index()
+    monkeypatch.setattr(knowledge_base, "LEXICAL_BUDGET_MS", 50)
+
+    search = kb.lexical_index.search
+
+    def slow_search(query, top_k, complaint_type, deadline):
+        time.sleep(0.03)   # within one query's budget, not within two
+        return search(query, top_k, complaint_type, deadline)
+
+    monkeypatch.setattr(kb.lexical_index, "search", slow_search)
+    results = kb.search_similar_complaints_batch(["qo-120", "power outage", "elevator stuck"], top_k=2)
+
+    assert all("matched_by" in r for query_results in results for r in query_results)
+
+
+def test_close_releases_the_client_and_the_index_reopens(make_kb):
+    kb = make_kb(hybrid_search=False)
+    kb.add_complaints_bulk(COMPLAINTS)
+
+    kb.close()
+
+    assert kb.client is None and kb.collection is None
+    assert make_kb(hybrid_search=False).collection.count() == 3
+
+
+def test_over_budget_results_are_cached(make_kb, monkeypatch):
+    kb = make_kb(hybrid_search=True)
+    kb.add_complaints_bulk(HYBRID_COMPLAINTS)
+    kb.build_lexical_index()
+    monkeypatch.setattr(kb.lexical_index, "search", lambda *args: None)   # always over budget
+
+    results = kb.search_similar_complaints("qo-120 tripping", top_k=3)
+
+    assert all("matched_by" not in r for r in results)
+    assert kb.result_cache.stats()["size"] == 1
+
+
+def test_embedding_cache_persistence_follows_the_env_setting(make_kb, monkeypatch, tmp_path):
+    from rag import knowledge_base
+
+    assert make_kb(hybrid_search=False).embedding_cache.stats()["persistent"] is False
+
+    monkeypatch.setattr(knowledge_base, "PERSIST_EMBEDDING_CACHE", True)
+    make_kb(hybrid_search=False).close()
+
+    assert (tmp_path / "chroma" / "embedding_cache.sqlite3").exists()
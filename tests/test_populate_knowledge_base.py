@@ -0,0 +1,166 @@
+import importlib.util
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+from sqlalchemy import create_engine, text
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      "scripts", "populate_knowledge_base.py")
+
+
+@pytest.fixture
+def populate(tmp_path, monkeypatch):
+    """scripts/populate_knowledge_base.py on a SQLite `complains` table"""
+    monkeypatch.setenv("DB_HOST", "127.0.0.1")
+    monkeypatch.setenv("DB_PASSWORD", "root")
+    spec = importlib.util.spec_from_file_location("populate_knowledge_base", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'bms.sqlite3'}",
+                           connect_args={"detect_types": sqlite3.PARSE_DECLTYPES})
+    with engine.connect() as conn:
+        conn.execute(text("""
+            CREATE TABLE complains (
+                compl_id INTEGER PRIMARY KEY, compl_title TEXT, compl_description TEXT,
+                compl_type TEXT, compl_solution TEXT, compl_job_status INTEGER, updated_at TIMESTAMP
+            )
+        """))
+        conn.commit()
+
+    monkeypatch.setattr(module, "get_db_engine", lambda: engine)
+    monkeypatch.setattr(module, "SYNC_STATE_FILE", str(tmp_path / "sync_state.json"))
+    monkeypatch.setattr(module, "SYNC_BATCH_SIZE", 2)
+    module.engine = engine
+    return module
+
+
+def add_rows(populate, *rows):
+    with populate.engine.connect() as conn:
+        for compl_id, status, solution, updated_at in rows:
+            conn.execute(text("""
+                INSERT OR REPLACE INTO complains VALUES (:id, 'Title', 'Description', 'Plumbing failure',
+                                                        :solution, :status, :updated_at)
+            """), {"id": compl_id, "status": status, "solution": solution, "updated_at": updated_at})
+        conn.commit()
+
+
+class FakeKB:
+    def __init__(self, fail_adds=False, fail_removes=False):
+        self.added, self.removed, self.batches = [], [], []
+        self.fail_adds, self.fail_removes = fail_adds, fail_removes
+
+    def add_complaints_bulk(self, complaints, **kwargs):
+        if self.fail_adds:
+            return {"added": 0, "errors": len(complaints)}
+        self.added.extend(c["complaint_id"] for c in complaints)
+        self.batches.append(len(complaints))
+        return {"added": len(complaints), "errors": 0}
+
+    def remove_complaints(self, complaint_ids):
+        if self.fail_removes and complaint_ids:
+            return None
+        self.removed.extend(complaint_ids)
+        return len(complaint_ids)
+
+
+def state(populate):
+    with open(populate.SYNC_STATE_FILE) as f:
+        return json.load(f)
+
+
+T0 = datetime(2026, 1, 1, 9, 0)
+T1 = datetime(2026, 1, 1, 10, 0)
+T2 = datetime(2026, 1, 1, 11, 0)
+
+
+def test_sync_without_state_does_nothing(populate):
+    kb = FakeKB()
+    populate.sync_incremental(kb)
+    assert kb.added == kb.removed == []
+
+
+def test_sync_picks_up_changes_past_the_mark(populate):
+    add_rows(populate, (1, 2, "fixed", T0), (2, 2, "fixed", T1), (3, 0, None, T1), (4, 2, "fixed", T2))
+    populate.save_sync_state(T0, 1)
+
+    kb = FakeKB()
+    populate.sync_incremental(kb)
+
+    assert kb.added == ["2", "4"]
+    assert kb.removed == ["3"]   # no longer resolved
+    assert state(populate) == {"updated_at": T2.isoformat(), "compl_id": 4}
+
+    kb = FakeKB()
+    populate.sync_incremental(kb)   # nothing new
+    assert kb.added == kb.removed == []
+
+
+def test_rows_are_synced_in_batches(populate):
+    add_rows(populate, *[(i, 2, "fixed", T1) for i in range(1, 6)])
+    populate.save_sync_state(T0, 0)
+
+    kb = FakeKB()
+    populate.sync_incremental(kb)
+
+    assert kb.batches == [2, 2, 1]   # SYNC_BATCH_SIZE
+
+
+def test_same_timestamp_is_ordered_by_id(populate):
+    add_rows(populate, (1, 2, "fixed", T1), (2, 2, "fixed", T1), (3, 2, "fixed", T1))
+    populate.save_sync_state(T1, 2)
+
+    kb = FakeKB()
+    populate.sync_incremental(kb)
+
+    assert kb.added == ["3"]
+
+
+def test_failed_upsert_keeps_the_mark(populate):
+    add_rows(populate, (1, 2, "fixed", T1), (2, 2, "fixed", T2))
+    populate.save_sync_state(T0, 0)
+
+    populate.sync_incremental(FakeKB(fail_adds=True))
+
+    assert state(populate) == {"updated_at": T0.isoformat(), "compl_id": 0}
+
+
+def test_failed_removal_keeps_the_mark(populate):
+    add_rows(populate, (1, 2, "fixed", T1), (2, 0, None, T1))
+    populate.save_sync_state(T0, 0)
+
+    populate.sync_incremental(FakeKB(fail_removes=True))
+    assert state(populate) == {"updated_at": T0.isoformat(), "compl_id": 0}
+
+    kb = FakeKB()
+    populate.sync_incremental(kb)   # the removal is retried
+    assert kb.removed == ["2"]
+
+
+class StreamingKB(FakeKB):
+    def add_complaints_streaming(self, batches, **kwargs):
+        for batch in batches:
+            self.add_complaints_bulk(batch)
+        return {"added": len(self.added), "skipped": 0, "errors": 0, "seconds": 0.0, "per_second": 0.0}
+
+    def get_stats(self):
+        return {"total_complaints": len(self.added)}
+
+
+def test_full_population_streams_batches_and_sets_the_mark(populate, monkeypatch):
+    add_rows(populate, *[(i, 2, "fixed", T1) for i in range(1, 6)], (6, 0, None, T2))
+    kb = StreamingKB()
+    monkeypatch.setattr(populate, "get_knowledge_base", lambda path: kb)
+    monkeypatch.setattr(populate, "WRITE_BATCH_SIZE", 2)
+
+    populate.populate_from_database()
+
+    assert sorted(kb.added) == ["1", "2", "3", "4", "5"]
+    assert kb.batches == [2, 2, 1]
+    # Taken before the load, over every row, so --incremental starts from there
+    assert state(populate) == {"updated_at": T2.isoformat(), "compl_id": 6}
@@ -0,0 +1,67 @@
+import sys
+import types
+
+import pytest
+
+from rag import registry
+
+
+class FakeKnowledgeBase:
+    instances = 0
+
+    def __init__(self, persist_directory, **kwargs):
+        FakeKnowledgeBase.instances += 1
+        self.persist_directory = persist_directory
+        self.hybrid_search = False
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_knowledge_base(monkeypatch):
+    # The registry imports rag.knowledge_base lazily; serve it the fake instead of Chroma
+    module = types.ModuleType("rag.knowledge_base")
+    module.ComplaintKnowledgeBase = FakeKnowledgeBase
+    monkeypatch.setitem(sys.modules, "rag.knowledge_base", module)
+    FakeKnowledgeBase.instances = 0
+    yield
+    registry.shutdown_knowledge_bases()
+
+
+def test_one_instance_per_directory(tmp_path):
+    a = registry.get_knowledge_base(str(tmp_path))
+    b = registry.get_knowledge_base(str(tmp_path / "."))
+    c = registry.get_knowledge_base(str(tmp_path / "other"))
+
+    assert a is b and a is not c
+    assert FakeKnowledgeBase.instances == 2
+
+
+def test_shutdown_closes_instances_and_runs_hooks(tmp_path):
+    kb = registry.get_knowledge_base(str(tmp_path))
+    calls = []
+    registry.add_shutdown_hook(lambda: calls.append("hook"))
+
+    registry.shutdown_knowledge_bases()
+
+    assert kb.closed
+    assert calls == ["hook"]
+    assert registry.loaded_knowledge_bases() == []
+    assert registry.get_knowledge_base(str(tmp_path)) is not kb
+
+
+def test_registry_shutdown_resets_the_action_server_handle(tmp_path, monkeypatch):
+    from actions import kb as action_kb
+    monkeypatch.setattr(action_kb, "KB_PERSIST_DIRECTORY", str(tmp_path))
+
+    kb = action_kb.get_kb()
+    assert action_kb.kb_ready() and action_kb.kb_status()["state"] == "ready"
+
+    registry.shutdown_knowledge_bases()   # e.g. at exit, not through shutdown_kb()
+
+    assert kb.closed
+    assert not action_kb.kb_ready()
+    assert action_kb.kb_status()["state"] == "cold"
+    assert action_kb.get_kb() is not kb
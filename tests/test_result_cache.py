@@ -0,0 +1,54 @@
+from rag.result_cache import ResultCache
+
+
+def test_hit_returns_a_copy():
+    cache = ResultCache()
+    cache.put("q", [{"title": "leak"}], cache.generation)
+
+    first = cache.get("q")
+    first[0]["title"] = "changed"
+
+    assert cache.get("q") == [{"title": "leak"}]
+    assert (cache.hits, cache.misses) == (2, 0)
+
+
+def test_invalidate_drops_entries():
+    cache = ResultCache()
+    cache.put("q", ["a"], cache.generation)
+    cache.invalidate()
+
+    assert cache.get("q") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_result_computed_before_a_write_is_not_stored():
+    cache = ResultCache()
+    generation = cache.generation   # search starts
+    cache.invalidate()              # a write lands while it runs
+    cache.put("q", ["stale"], generation)
+
+    assert cache.get("q") is None
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("rag.result_cache.time.monotonic", lambda: now[0])
+    cache = ResultCache(ttl_seconds=10)
+    cache.put("q", ["a"], cache.generation)
+
+    now[0] += 9
+    assert cache.get("q") == ["a"]
+    now[0] += 2
+    assert cache.get("q") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_size=2)
+    cache.put("a", 1, cache.generation)
+    cache.put("b", 2, cache.generation)
+    cache.get("a")
+    cache.put("c", 3, cache.generation)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
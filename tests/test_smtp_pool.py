@@ -0,0 +1,111 @@
+import socketserver
+import threading
+
+import pytest
+
+from actions.smtp_pool import SMTPConnectionPool
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: no auth, no TLS; RCPT to reject@... is refused"""
+
+    def reply(self, line):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 localhost ready")
+        while True:
+            line = self.rfile.readline().decode().rstrip("\r\n")
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == "EHLO":
+                self.reply("250 localhost")
+            elif command == "RCPT" and "reject@" in line:
+                self.reply("550 no such user")
+            elif command in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 go ahead")
+                body = []
+                while True:
+                    data = self.rfile.readline().decode()
+                    if data in (".\r\n", ".\n", ""):
+                        break
+                    body.append(data)
+                self.server.messages.append("".join(body))
+                self.reply("250 queued")
+            elif command == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 not implemented")
+
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SMTPHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.messages = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def pool(smtp_server):
+    pool = SMTPConnectionPool("127.0.0.1", smtp_server.server_address[1], starttls=False,
+                              max_connections=2, timeout=5)
+    yield pool
+    pool.close()
+
+
+def test_connection_is_reused_across_sends(pool, smtp_server):
+    for i in range(3):
+        pool.send("bot@example.com", ["tenant@example.com"], f"Subject: {i}\r\n\r\nbody {i}")
+
+    assert len(smtp_server.messages) == 3
+    assert smtp_server.connections == 1
+    assert pool.stats["connects"] == 1
+    assert pool.stats["reuses"] == 2
+    assert pool.stats["sent"] == 3
+
+
+def test_rejected_recipient_keeps_the_connection(pool, smtp_server):
+    errors = pool.send_many([
+        ("bot@example.com", ["reject@example.com"], "Subject: a\r\n\r\na"),
+        ("bot@example.com", ["tenant@example.com"], "Subject: b\r\n\r\nb"),
+    ])
+
+    assert errors[0] is not None and errors[1] is None
+    assert (pool.stats["sent"], pool.stats["rejected"], pool.stats["connects"]) == (1, 1, 1)
+    assert len(smtp_server.messages) == 1
+
+
+def test_idle_connection_past_max_idle_is_replaced(pool, smtp_server):
+    pool.send("bot@example.com", ["tenant@example.com"], "Subject: a\r\n\r\na")
+    pool.max_idle_seconds = 0
+    pool.send("bot@example.com", ["tenant@example.com"], "Subject: b\r\n\r\nb")
+
+    assert smtp_server.connections == 2
+    assert pool.stats["reuses"] == 0
+
+
+def test_concurrent_sends_keep_accurate_stats(pool, smtp_server):
+    def worker():
+        for _ in range(10):
+            pool.send("bot@example.com", ["tenant@example.com"], "Subject: x\r\n\r\nx")
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert pool.stats["sent"] == len(smtp_server.messages) == 40
+    assert smtp_server.connections <= 2   # max_connections
+    assert pool.stats["connects"] + pool.stats["reuses"] == 40
@@ -0,0 +1,28 @@
+from actions.vision_cache import VisionCache
+
+
+def test_results_persist_across_instances(tmp_path):
+    path = str(tmp_path / "vision.sqlite3")
+    VisionCache(persist_path=path).put("analysis:m:abc", {"text": "leak"})
+
+    assert VisionCache(persist_path=path).get("analysis:m:abc") == {"text": "leak"}
+
+
+def test_unwritable_path_falls_back_to_memory(tmp_path):
+    blocker = tmp_path / "not_a_dir"
+    blocker.write_text("")
+    cache = VisionCache(persist_path=str(blocker / "vision.sqlite3"))   # constructing never fails
+
+    cache.put("k", [1, 2])
+
+    assert cache.get("k") == [1, 2]
+    assert cache.stats()["persistent"] is False
+
+
+def test_lru_bound():
+    cache = VisionCache(max_size=2)
+    for key in "abc":
+        cache.put(key, key)
+
+    assert cache.get("a") is None
+    assert cache.get("c") == "c"